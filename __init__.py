@@ -1 +1 @@
-__all__ = ['ibfuncs', 'ibreal', 'ibcomp','ibtools']
+__all__ = ['ibfuncs', 'ibreal', 'ibcomp','ibtools', 'ibcontext', 'ibstore', 'ibarray', 'ibfractal', 'ibcodec', 'ibbinary', 'ibbench', 'ibstats']
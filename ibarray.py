@@ -0,0 +1,363 @@
+from .ibcontext import getcontext
+from .ibreal import Ival, IBReal as R, _pow10
+from .ibcomp import IBComp as C
+from .ibfuncs import _fx_from_real
+
+# one value as a fixed-point integer at off
+def _fixed(val, off, prec):
+    if isinstance(val, int):
+        return val * _pow10(off)
+    if not isinstance(val, R):
+        val = R(val, prec=prec)
+    return _fx_from_real(val, off)
+
+# batched fixed-point reals
+class IBRealArray:
+    """
+    IBRealArray holds many reals as plain integers against one shared offset, so elementwise math runs
+    as a single loop over ints -- no IBReal object, alignment or trim per element. Results are floored
+    to the shared offset (fixed-point), not trimmed to a digit count.
+
+    Usage:
+    arr = IBRealArray(raw, prec=None, off=None, trim_on=None)
+
+    raw: iterable of IBReal objects, numbers or strings, or another IBRealArray
+
+    prec: precision of the IBReal values handed back (to_list, indexing, reductions)
+
+    off: shared offset -- digits kept after the decimal point (defaults to prec)
+
+    trim_on: trim_on of the IBReal values handed back
+
+    prec and trim_on default to the current ibcontext.
+
+    Math with another array is elementwise (lengths must match); with a scalar the scalar is
+    converted once and applied to every element. Comparisons return masks (lists of bools) for
+    where(), select() and the builtins any()/all().
+    """
+    def __init__(self, raw, prec=None, off=None, trim_on=None):
+        ctx = getcontext()
+        self.prec = ctx.prec if prec is None else prec
+        self.trim_on = ctx.trim_on if trim_on is None else trim_on
+        self.off = self.prec if off is None else off
+        if isinstance(raw, type(self)):
+            self.nums = raw._at(self.off)
+        else:
+            self.nums = [_fixed(i, self.off, self.prec) for i in raw]
+
+    # build straight from fixed-point integers
+    @classmethod
+    def _from_nums(cls, nums, off, prec, trim_on):
+        tmp = cls.__new__(cls)
+        (tmp.nums, tmp.off, tmp.prec, tmp.trim_on) = (nums, off, prec, trim_on)
+        return tmp
+
+    # count evenly spaced values from start to stop (inclusive)
+    @classmethod
+    def linspace(cls, start, stop, count, prec=None, off=None, trim_on=None):
+        tmp = cls((start, stop), prec=prec, off=off, trim_on=trim_on)
+        (lo, hi) = tmp.nums
+        if count == 1:
+            return cls._from_nums([lo], tmp.off, tmp.prec, tmp.trim_on)
+        nums = [lo + (hi - lo) * i // (count - 1) for i in range(count)]
+        return cls._from_nums(nums, tmp.off, tmp.prec, tmp.trim_on)
+
+    @property
+    def kwargs(self):
+        return {'prec':self.prec, 'off':self.off, 'trim_on':self.trim_on}
+
+    # mantissas at another offset
+    def _at(self, off):
+        if off >= self.off:
+            pad = _pow10(off - self.off)
+            return [i * pad for i in self.nums]
+        pad = _pow10(self.off - off)
+        return [i // pad for i in self.nums]
+
+    def _new(self, nums, off=None):
+        return type(self)._from_nums(nums, self.off if off is None else off, self.prec, self.trim_on)
+
+    # (own mantissas, other's mantissas or scalar, shared offset) -- aligned once per batch
+    def _pair(self, other):
+        if isinstance(other, type(self)):
+            if len(other) != len(self):
+                raise ValueError('Length mismatch {} != {}'.format(len(self), len(other)))
+            if other.off == self.off:
+                return (self.nums, other.nums, self.off)
+            off = max(self.off, other.off)
+            return (self._at(off), other._at(off), off)
+        return (self.nums, _fixed(other, self.off, self.prec), self.off)
+
+    def _real(self, num):
+        return R(Ival(num, self.off) if num else Ival(0, 0), prec=self.prec, trim_on=self.trim_on)
+
+    def to_list(self):
+        return [self._real(i) for i in self.nums]
+
+    def __len__(self):
+        return len(self.nums)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self._new(self.nums[idx])
+        return self._real(self.nums[idx])
+
+    def __add__(self, other):
+        (snums, onums, off) = self._pair(other)
+        if isinstance(onums, list):
+            return self._new([a + b for (a, b) in zip(snums, onums)], off)
+        return self._new([a + onums for a in snums], off)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        (snums, onums, off) = self._pair(other)
+        if isinstance(onums, list):
+            return self._new([a - b for (a, b) in zip(snums, onums)], off)
+        return self._new([a - onums for a in snums], off)
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        (snums, onums, off) = self._pair(other)
+        pad = _pow10(off)
+        if isinstance(onums, list):
+            return self._new([a * b // pad for (a, b) in zip(snums, onums)], off)
+        return self._new([a * onums // pad for a in snums], off)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        (snums, onums, off) = self._pair(other)
+        pad = _pow10(off)
+        if isinstance(onums, list):
+            return self._new([a * pad // b for (a, b) in zip(snums, onums)], off)
+        return self._new([a * pad // onums for a in snums], off)
+
+    def __rtruediv__(self, other):
+        num = _fixed(other, self.off, self.prec) * _pow10(self.off)
+        return self._new([num // b for b in self.nums])
+
+    def __neg__(self):
+        return self._new([-i for i in self.nums])
+
+    def __abs__(self):
+        return self._new([abs(i) for i in self.nums])
+
+    # comparisons -- masks
+    def _cmp(self, other, test):
+        (snums, onums, _) = self._pair(other)
+        if isinstance(onums, list):
+            return [test(a, b) for (a, b) in zip(snums, onums)]
+        return [test(a, onums) for a in snums]
+
+    def __eq__(self, other):
+        return self._cmp(other, lambda a, b: a == b)
+
+    def __ne__(self, other):
+        return self._cmp(other, lambda a, b: a != b)
+
+    def __lt__(self, other):
+        return self._cmp(other, lambda a, b: a < b)
+
+    def __le__(self, other):
+        return self._cmp(other, lambda a, b: a <= b)
+
+    def __gt__(self, other):
+        return self._cmp(other, lambda a, b: a > b)
+
+    def __ge__(self, other):
+        return self._cmp(other, lambda a, b: a >= b)
+
+    __hash__ = None
+
+    # elements where mask is true
+    def select(self, mask):
+        return self._new([i for (i, m) in zip(self.nums, mask) if m])
+
+    # self where mask is true, other elsewhere
+    def where(self, mask, other):
+        (snums, onums, off) = self._pair(other)
+        if not isinstance(onums, list):
+            onums = [onums] * len(snums)
+        return self._new([a if m else b for (a, b, m) in zip(snums, onums, mask)], off)
+
+    # reductions
+    def sum(self):
+        return self._real(sum(self.nums))
+
+    def min(self):
+        return self._real(min(self.nums))
+
+    def max(self):
+        return self._real(max(self.nums))
+
+    def __repr__(self):
+        return '{}([{}])'.format(type(self).__name__, ', '.join(repr(i) for i in self.to_list()))
+
+# batched fixed-point complex numbers
+class IBCompArray:
+    """
+    IBCompArray is the complex counterpart of IBRealArray: real and imaginary mantissas kept as two
+    integer lists against one shared offset.
+
+    Usage:
+    arr = IBCompArray(raw, prec=None, off=None, trim_on=None)
+
+    raw: iterable of IBComp objects (or anything IBComp accepts), another IBCompArray, or a
+         2-tuple of IBRealArrays (real parts, imaginary parts)
+
+    prec, off, trim_on: as for IBRealArray
+    """
+    def __init__(self, raw, prec=None, off=None, trim_on=None):
+        if isinstance(raw, type(self)):
+            (rl, il) = (raw.real, raw.imag)
+        elif isinstance(raw, tuple) and len(raw) == 2 and isinstance(raw[0], IBRealArray):
+            (rl, il) = raw
+        else:
+            vals = [i if isinstance(i, C) else C(i, prec=prec, trim_on=trim_on) for i in raw]
+            (rl, il) = ([i.rcomp for i in vals], [i.icomp for i in vals])
+        self.real = IBRealArray(rl, prec=prec, off=off, trim_on=trim_on)
+        self.imag = IBRealArray(il, **self.real.kwargs)
+        if len(self.real) != len(self.imag):
+            raise ValueError('Length mismatch {} != {}'.format(len(self.real), len(self.imag)))
+        (self.prec, self.off, self.trim_on) = (self.real.prec, self.real.off, self.real.trim_on)
+
+    @classmethod
+    def _from_nums(cls, rnums, inums, off, prec, trim_on):
+        tmp = cls.__new__(cls)
+        tmp.real = IBRealArray._from_nums(rnums, off, prec, trim_on)
+        tmp.imag = IBRealArray._from_nums(inums, off, prec, trim_on)
+        (tmp.prec, tmp.off, tmp.trim_on) = (prec, off, trim_on)
+        return tmp
+
+    @property
+    def kwargs(self):
+        return self.real.kwargs
+
+    def _new(self, rnums, inums, off=None):
+        return type(self)._from_nums(rnums, inums, self.off if off is None else off, self.prec, self.trim_on)
+
+    # (own pair, other's pair of lists or scalars, shared offset)
+    def _pair(self, other):
+        if isinstance(other, type(self)):
+            (sr, orl, off) = self.real._pair(other.real)
+            (si, oil, _) = self.imag._pair(other.imag)
+            return ((sr, si), (orl, oil), off)
+        if isinstance(other, IBRealArray):
+            (sr, orl, off) = self.real._pair(other)
+            si = self.imag._at(off)
+            return ((sr, si), (orl, [0] * len(orl)), off)
+        if not isinstance(other, C):
+            other = C(other, prec=self.prec)
+        return ((self.real.nums, self.imag.nums),
+                (_fixed(other.rcomp, self.off, self.prec), _fixed(other.icomp, self.off, self.prec)), self.off)
+
+    def to_list(self):
+        return [C((a, b), prec=self.prec, trim_on=self.trim_on) for (a, b) in zip(self.real.to_list(), self.imag.to_list())]
+
+    def __len__(self):
+        return len(self.real)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self._new(self.real.nums[idx], self.imag.nums[idx])
+        return C((self.real[idx], self.imag[idx]), prec=self.prec, trim_on=self.trim_on)
+
+    def __add__(self, other):
+        ((sr, si), (orl, oil), off) = self._pair(other)
+        if isinstance(orl, list):
+            return self._new([a + b for (a, b) in zip(sr, orl)], [a + b for (a, b) in zip(si, oil)], off)
+        return self._new([a + orl for a in sr], [a + oil for a in si], off)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        ((sr, si), (orl, oil), off) = self._pair(other)
+        if isinstance(orl, list):
+            return self._new([a - b for (a, b) in zip(sr, orl)], [a - b for (a, b) in zip(si, oil)], off)
+        return self._new([a - orl for a in sr], [a - oil for a in si], off)
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        ((sr, si), (orl, oil), off) = self._pair(other)
+        pad = _pow10(off)
+        if not isinstance(orl, list):
+            (orl, oil) = ([orl] * len(sr), [oil] * len(sr))
+        rnums = [(a*c - b*d) // pad for (a, b, c, d) in zip(sr, si, orl, oil)]
+        inums = [(a*d + b*c) // pad for (a, b, c, d) in zip(sr, si, orl, oil)]
+        return self._new(rnums, inums, off)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        ((sr, si), (orl, oil), off) = self._pair(other)
+        pad = _pow10(off)
+        if not isinstance(orl, list):
+            (orl, oil) = ([orl] * len(sr), [oil] * len(sr))
+        rnums = list()
+        inums = list()
+        for (a, b, c, d) in zip(sr, si, orl, oil):
+            den = c*c + d*d
+            rnums.append((a*c + b*d) * pad // den)
+            inums.append((b*c - a*d) * pad // den)
+        return self._new(rnums, inums, off)
+
+    def __rtruediv__(self, other):
+        if not isinstance(other, C):
+            other = C(other, prec=self.prec)
+        tmp = self._new([_fixed(other.rcomp, self.off, self.prec)] * len(self),
+                        [_fixed(other.icomp, self.off, self.prec)] * len(self))
+        return tmp.__truediv__(self)
+
+    def __neg__(self):
+        return self._new([-i for i in self.real.nums], [-i for i in self.imag.nums])
+
+    @property
+    def conj(self):
+        return self._new(self.real.nums, [-i for i in self.imag.nums])
+
+    # squared modulus -- no square root
+    def abs2(self):
+        pad = _pow10(self.off)
+        return self.real._new([(a*a + b*b) // pad for (a, b) in zip(self.real.nums, self.imag.nums)])
+
+    def __eq__(self, other):
+        ((sr, si), (orl, oil), _) = self._pair(other)
+        if not isinstance(orl, list):
+            (orl, oil) = ([orl] * len(sr), [oil] * len(sr))
+        return [a == c and b == d for (a, b, c, d) in zip(sr, si, orl, oil)]
+
+    def __ne__(self, other):
+        return [not i for i in self.__eq__(other)]
+
+    __hash__ = None
+
+    def select(self, mask):
+        return self._new([i for (i, m) in zip(self.real.nums, mask) if m], [i for (i, m) in zip(self.imag.nums, mask) if m])
+
+    def where(self, mask, other):
+        ((sr, si), (orl, oil), off) = self._pair(other)
+        if not isinstance(orl, list):
+            (orl, oil) = ([orl] * len(sr), [oil] * len(sr))
+        return self._new([a if m else b for (a, b, m) in zip(sr, orl, mask)],
+                         [a if m else b for (a, b, m) in zip(si, oil, mask)], off)
+
+    def sum(self):
+        return C((self.real.sum(), self.imag.sum()), prec=self.prec, trim_on=self.trim_on)
+
+    def __repr__(self):
+        return '{}([{}])'.format(type(self).__name__, ', '.join(repr(i) for i in self.to_list()))
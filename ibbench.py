@@ -0,0 +1,319 @@
+import json
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from decimal import Decimal, Context, MAX_PREC, getcontext as decctx, localcontext as declocal
+from types import SimpleNamespace
+from .ibreal import IBReal as R
+from .ibcomp import IBComp as C
+from .ibcontext import localcontext
+from .ibfuncs import ib_exp, ib_log, ib_sin, ib_cos, ib_arctan, ib_pi, ib_root
+from .ibtools import clear_caches, clear_fx_consts
+
+# benchmark suite -- ib_* functions, IBReal and IBComp arithmetic over a precision sweep
+#
+# $ python -m <package>.ibbench --out now.json --baseline before.json
+#
+# each case is timed cold (memo caches and cached constants cleared before every call) and
+# warm (repeat calls after a first one, so memoized functions answer from cache), and its
+# result is checked against the decimal module at matching precision
+
+# default precision sweep (digits)
+PRECS = (50, 450, 2000, 10000)
+
+# slowdown (fraction) past which compare() reports a regression
+THRESHOLD = 0.25
+
+# timing differences under this many seconds are noise, never regressions
+_NOISE = 2e-6
+
+# digits that may be lost to trimming and still count as accurate
+_SLACK = 2
+
+# extra decimal digits for reference values
+_REFGUARD = 20
+
+# results file format version
+_VERSION = 1
+
+# decimal references -- built from +-*/ and sqrt, since decimal's exp/ln/** take
+# minutes at 10000 digits
+def _dpi():
+    # Gauss-Legendre
+    (a, b, t, p) = (Decimal(1), Decimal(1) / Decimal(2).sqrt(), Decimal(1) / 4, Decimal(1))
+    prev = None
+    while prev != a:
+        prev = a
+        (a, b, t, p) = ((a+b) / 2, (a*b).sqrt(), t - p * ((a-b) / 2)**2, 2*p)
+    return (a+b)**2 / (4*t)
+
+# x**k / k! summed from the term given, sign alternating
+def _dseries(x, term, k):
+    (total, x2, prev) = (term, x*x, None)
+    while total != prev:
+        prev = total
+        term = -term * x2 / ((k+1) * (k+2))
+        total += term
+        k += 2
+    return total
+
+def _dsin(x):
+    return _dseries(x, x, 1)
+
+def _dcos(x):
+    return _dseries(x, Decimal(1), 0)
+
+# exp(x) = exp(x/2**k)**(2**k) -- each squaring costs a bit, paid for up front
+def _dexp(x):
+    k = int(decctx().prec ** 0.5)
+    with declocal() as dctx:
+        dctx.prec += k*3//10 + 5
+        (total, term, x, n, prev) = (Decimal(1), Decimal(1), x / 2**k, 0, None)
+        while total != prev:
+            prev = total
+            n += 1
+            term = term * x / n
+            total += term
+        for _ in range(k):
+            total *= total
+    return +total
+
+# ln(x) = pi / (2*agm(1, 4/s)) - m*ln(2) with s = x * 2**m past 10**(prec/2)
+def _dln(x):
+    def agm(a, b):
+        while a != b:
+            (na, b) = ((a+b) / 2, (a*b).sqrt())
+            if na == a:
+                break
+            a = na
+        return a
+    m = decctx().prec * 3322 // 2000 + 10
+    (pi, big) = (_dpi(), Decimal(2)**m)
+    ln2 = pi / (2 * m * agm(Decimal(1), 4 / big))
+    return pi / (2 * agm(Decimal(1), 4 / (x*big))) - m*ln2
+
+# x**(1/n) by Newton's method from a float start
+def _droot(x, n):
+    (y, prev) = (Decimal(float(x) ** (1/n)), None)
+    while y != prev:
+        prev = y
+        y = y - (y**n - x) / (n * y**(n-1))
+    return y
+
+# halve the angle until the series is short: atan(x) = 2*atan(x / (1 + sqrt(1+x*x)))
+def _datan(x):
+    halvings = max(4, int(decctx().prec ** 0.5) // 2)
+    for _ in range(halvings):
+        x = x / (1 + (1 + x*x).sqrt())
+    (total, term, x2, k, prev) = (x, x, x*x, 1, None)
+    while total != prev:
+        prev = total
+        term = -term * x2
+        k += 2
+        total += term / k
+    return total * 2**halvings
+
+def _dcmul(a, b):
+    return (a[0]*b[0] - a[1]*b[1], a[0]*b[1] + a[1]*b[0])
+
+def _dcdiv(a, b):
+    den = b[0]*b[0] + b[1]*b[1]
+    return ((a[0]*b[0] + a[1]*b[1]) / den, (a[1]*b[0] - a[0]*b[1]) / den)
+
+def _dcpow(a, n):
+    tmp = a
+    for _ in range(n-1):
+        tmp = _dcmul(tmp, a)
+    return tmp
+
+# no rounding -- scaleb only moves the exponent
+_EXACT = Context(prec=MAX_PREC)
+
+# exact decimal value of an IBReal (pairs for an IBComp)
+def _dec(val):
+    if isinstance(val, C):
+        return (_dec(val.rcomp), _dec(val.icomp))
+    (num, off) = val.ival
+    return Decimal(num).scaleb(-off, _EXACT)
+
+# correct significant digits of got against ref (both Decimal or both pairs)
+def _digits(got, ref, cap):
+    if isinstance(ref, tuple):
+        err = max(abs(got[0] - ref[0]), abs(got[1] - ref[1]))
+        ref = max(abs(ref[0]), abs(ref[1]))
+    else:
+        err = abs(got - ref)
+    if err == 0:
+        return cap
+    return min(cap, round(float(-(err / abs(ref)).log10()), 1))
+
+# benchmark operands at one precision -- full-length mantissas, fixed from run to run
+# x in (0, 1), y in (1, 2), cx = x + yi, cy = y - xi, wide = x*y untrimmed
+class _Operands:
+    def __init__(self, prec, radix):
+        kw = {'prec':prec, 'radix':radix}
+        self.prec = prec
+        self.x = R(2, **kw) / 3 + R(1, **kw) / 7
+        self.y = R(1, **kw) + R(5, **kw) / 13
+        self.cx = C((self.x, self.y), **kw)
+        self.cy = C((self.y, -self.x), **kw)
+        self.wide = R(self.x, trim_on=False, **kw) * R(self.y, trim_on=False, **kw)
+
+# (name, call on operands, decimal reference on decimal operands)
+_CASES = (
+    ('ib_exp', lambda o: ib_exp(o.x), lambda d: _dexp(d.x)),
+    ('ib_log', lambda o: ib_log(o.y), lambda d: _dln(d.y)),
+    ('ib_sin', lambda o: ib_sin(o.x), lambda d: _dsin(d.x)),
+    ('ib_cos', lambda o: ib_cos(o.x), lambda d: _dcos(d.x)),
+    ('ib_arctan', lambda o: ib_arctan(o.x), lambda d: _datan(d.x)),
+    ('ib_pi', lambda o: ib_pi(**o.x.kwargs), lambda d: _dpi()),
+    ('ib_root', lambda o: ib_root(o.y, 3), lambda d: _droot(d.y, 3)),
+    ('real_add', lambda o: o.x + o.y, lambda d: d.x + d.y),
+    ('real_mul', lambda o: o.x * o.y, lambda d: d.x * d.y),
+    ('real_div', lambda o: o.x / o.y, lambda d: d.x / d.y),
+    ('real_trim', lambda o: o.wide.dtrim(o.prec), lambda d: d.x * d.y),
+    ('comp_mul', lambda o: o.cx * o.cy, lambda d: _dcmul(d.cx, d.cy)),
+    ('comp_div', lambda o: o.cx / o.cy, lambda d: _dcdiv(d.cx, d.cy)),
+    ('comp_pow', lambda o: o.cx ** 7, lambda d: _dcpow(d.cx, 7)),
+)
+
+# names of all cases
+CASES = tuple(i[0] for i in _CASES)
+
+# wipe memo caches, pooled values and cached fixed-point constants
+def _cold():
+    clear_caches()
+    clear_fx_consts()
+
+# best seconds per call -- cold: one call per run, caches cleared first
+# warm: enough calls per run to fill about 20ms, after a first call
+def _time(func, repeat, cold):
+    best = None
+    if cold:
+        for _ in range(repeat):
+            _cold()
+            start = time.perf_counter()
+            func()
+            tmp = time.perf_counter() - start
+            best = tmp if best is None else min(best, tmp)
+        return best
+    start = time.perf_counter()
+    func()
+    number = max(1, min(10000, int(0.02 / max(time.perf_counter() - start, 1e-7))))
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        tmp = (time.perf_counter() - start) / number
+        best = tmp if best is None else min(best, tmp)
+    return best
+
+# run the suite -- returns a results dict (see save/compare/report)
+# cases: names from CASES (all by default); radix: 10 or 2 (see ibbinary)
+# check: verify accuracy against decimal; log: callable given one line per case
+def run(precs=PRECS, cases=None, radix=10, repeat=5, check=True, log=None):
+    todo = [i for i in _CASES if cases is None or i[0] in cases]
+    if cases is not None:
+        unknown = set(cases) - set(CASES)
+        if unknown:
+            raise ValueError('Unknown cases {}'.format(sorted(unknown)))
+    rows = list()
+    for prec in precs:
+        with localcontext(prec=prec, radix=radix):
+            ops = _Operands(prec, radix)
+            if check:
+                with declocal() as dctx:
+                    dctx.prec = prec + _REFGUARD
+                    dops = SimpleNamespace(x=_dec(ops.x), y=_dec(ops.y), cx=_dec(ops.cx), cy=_dec(ops.cy))
+            for (name, func, ref) in todo:
+                call = lambda: func(ops)
+                row = {'case':name, 'prec':prec, 'cold':_time(call, repeat, True), 'warm':_time(call, repeat, False)}
+                if check:
+                    with declocal() as dctx:
+                        dctx.prec = prec + _REFGUARD
+                        row['digits'] = _digits(_dec(call()), ref(dops), prec + _REFGUARD)
+                    row['ok'] = row['digits'] >= prec - _SLACK
+                rows.append(row)
+                if log is not None:
+                    log(_line(row))
+    meta = {'version':_VERSION, 'python':platform.python_version(), 'machine':platform.machine(),
+            'radix':radix, 'repeat':repeat, 'precs':list(precs), 'time':time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'meta':meta, 'results':rows}
+
+# write results as JSON
+def save(results, path):
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=1)
+
+def load(path):
+    with open(path) as fh:
+        results = json.load(fh)
+    if results.get('meta', {}).get('version') != _VERSION:
+        raise ValueError('{} is not a version {} benchmark file'.format(path, _VERSION))
+    return results
+
+# timings in results slower than baseline by more than threshold (a fraction)
+# [{case, prec, kind, old, new, ratio}] -- cases/precisions missing from either side are skipped
+def compare(results, baseline, threshold=THRESHOLD):
+    old = {(i['case'], i['prec']): i for i in baseline['results']}
+    slower = list()
+    for row in results['results']:
+        base = old.get((row['case'], row['prec']))
+        if base is None:
+            continue
+        for kind in ('cold', 'warm'):
+            (was, now) = (base[kind], row[kind])
+            if now > was * (1 + threshold) and now - was > _NOISE:
+                slower.append({'case':row['case'], 'prec':row['prec'], 'kind':kind, 'old':was, 'new':now, 'ratio':now / was})
+    return slower
+
+# rows whose accuracy check failed
+def inaccurate(results):
+    return [i for i in results['results'] if not i.get('ok', True)]
+
+def _fmt(sec):
+    for (unit, scale) in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if sec >= scale:
+            return '{:.3g}{}'.format(sec / scale, unit)
+    return '{:.3g}ns'.format(sec * 1e9)
+
+def _line(row):
+    acc = '' if 'digits' not in row else '  {:>7} digits{}'.format(row['digits'], '' if row['ok'] else '  INACCURATE')
+    return '{:<10} {:>6}  cold {:>9}  warm {:>9}{}'.format(row['case'], row['prec'], _fmt(row['cold']), _fmt(row['warm']), acc)
+
+def _regline(reg):
+    return 'REGRESSION {case} prec {prec} {kind}: {0} -> {1} (x{ratio:.2f})'.format(_fmt(reg['old']), _fmt(reg['new']), **reg)
+
+# text table of results, then any regressions
+def report(results, regressions=()):
+    lines = [_line(i) for i in results['results']]
+    lines.extend(_regline(i) for i in regressions)
+    return '\n'.join(lines)
+
+# command line -- exit status 1 on a regression or an inaccurate result
+def main(argv=None):
+    parser = ArgumentParser(prog='ibbench', description='IBReal benchmark suite')
+    parser.add_argument('--prec', type=int, nargs='+', default=list(PRECS), help='precision sweep (digits)')
+    parser.add_argument('--case', nargs='+', choices=CASES, help='cases to run (default all)')
+    parser.add_argument('--radix', type=int, choices=(10, 2), default=10, help='IBReal backend')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs per case (best is kept)')
+    parser.add_argument('--no-check', dest='check', action='store_false', help='skip accuracy checks')
+    parser.add_argument('--out', help='write results (JSON) here')
+    parser.add_argument('--baseline', help='compare against these results (JSON)')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='regression threshold (fraction)')
+    args = parser.parse_args(argv)
+    log = lambda line: print(line, file=sys.stderr, flush=True)
+    results = run(args.prec, args.case, args.radix, args.repeat, args.check, log)
+    if args.out:
+        save(results, args.out)
+    regressions = compare(results, load(args.baseline), args.threshold) if args.baseline else []
+    for i in regressions:
+        print(_regline(i))
+    bad = inaccurate(results)
+    for i in bad:
+        print('INACCURATE {case} prec {prec}: {digits} digits'.format(**i))
+    return 1 if regressions or bad else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
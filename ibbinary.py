@@ -0,0 +1,369 @@
+from functools import lru_cache
+from .ibcontext import getcontext, ROUND_HALF_EVEN, _ROUNDINGS
+from .ibreal import IBReal, Ival, _pow10, _rinv
+from .ibstats import ib_stats as _stats
+
+# bits carried for prec decimal digits -- prec*log2(10) plus guard bits, so the
+# binary rounding error stays well under the last decimal digit shown
+_GUARD_BITS = 8
+
+def _bits(prec):
+    return prec * 3322 // 1000 + _GUARD_BITS
+
+@lru_cache(maxsize=256)
+def _pow5(k):
+    return 5**k
+
+# (x, k) with x ~ 2**k / den -- cached like ibreal._recip
+@lru_cache(maxsize=32)
+def _brecip(den, keep):
+    k = den.bit_length() + keep + 32
+    return (_rinv(den, k), k)
+
+# binary pair (num, exp) for the decimal pair (num, off): num*2**-exp ~ num*10**-off
+# with at least bits significant bits -- exact whenever the value fits
+def _from_dec(num, off, bits):
+    if off <= 0:
+        return Ival(num * _pow10(-off), 0)
+    if num == 0:
+        return Ival(0, 0)
+    pad = _pow10(off)
+    exp = bits + 2 + pad.bit_length() - abs(num).bit_length()
+    tmp = (abs(num) << exp) // pad if exp >= 0 else abs(num) // (pad << -exp)
+    return Ival(-tmp if num < 0 else tmp, exp)
+
+# drop low-order bits so that num keeps bits bits -- a shift, rounded per rounding
+def _bchop(num, exp, bits, rounding=None):
+    mag = abs(num)
+    drop = mag.bit_length() - bits
+    if drop <= 0:
+        return Ival(num, exp)
+    if _stats.on:
+        _stats.op('trim', num)
+    quo = mag >> drop
+    if rounding == ROUND_HALF_EVEN:
+        (rem, half) = (mag & ((1 << drop) - 1), 1 << (drop-1))
+        if rem > half or (rem == half and quo & 1):
+            quo += 1
+    return Ival(-quo if num < 0 else quo, exp-drop)
+
+# arbitrary-precision real number with a binary exponent
+class IBBinReal(IBReal):
+    """
+    IBBinReal is the binary-radix IBReal backend: the value is num * 2**-exp for the internal
+    pair self.bval = Ival(num, exp), so trimming and alignment are bit shifts rather than
+    multiplies and divides by powers of ten. Base ten only comes back for display.
+
+    Usage:
+    realnum = IBReal(raw, radix=2)
+    with localcontext(radix=2): realnum = IBReal(raw)
+
+    raw, prec, trim_on and rep are as for IBReal -- (integer, offset) tuples and Ival objects are
+    still decimal, and prec still counts decimal digits (the mantissa keeps about prec*log2(10) bits).
+
+    self.ival is the exact decimal pair, worked out when read, so everything written against
+    IBReal (ibfuncs, ibtools, ibarray) takes binary values as they are. Arithmetic, trims,
+    comparisons and IBComp kernels on binary components stay binary.
+    """
+    _radix = 2
+    _tag = b'B'
+
+    def __init__(self, raw, prec=None, trim_on=None, rep=None, radix=None):
+        ctx = getcontext()
+        self.prec = ctx.prec if prec is None else prec
+        self.trim_on = ctx.trim_on if trim_on is None else trim_on
+        self.rounding = ctx.rounding
+        self.rep = rep
+        try:
+            # another IBBinReal instance
+            if isinstance(raw, IBBinReal):
+                self.bval = raw.bval
+                self.prec = prec or raw.prec
+            # a decimal IBReal instance
+            elif isinstance(raw, IBReal):
+                self.prec = prec or raw.prec
+                self.ival = raw.ival
+            # Ival instance (decimal)
+            elif isinstance(raw, Ival):
+                self.ival = raw
+            # 2-tuple/list representing (decimal) ival members
+            elif isinstance(raw, tuple) or isinstance(raw, list):
+                self.ival = Ival(*raw)
+            # an integer
+            elif isinstance(raw, int):
+                self.bval = Ival(raw, 0)
+            # something else -- text or float
+            else:
+                self.ival = self._from_raw(raw)
+            self.trim()
+        except Exception as e:
+            raise ValueError('Failed to coerce {}:{} to Ival'.format(type(raw), raw)) from e
+
+    # exact decimal pair: num*2**-exp is num*5**exp / 10**exp
+    @property
+    def ival(self):
+        (num, exp) = self.bval
+        if exp <= 0:
+            return Ival(num << -exp, 0)
+        return Ival(num * _pow5(exp), exp)
+
+    @ival.setter
+    def ival(self, val):
+        self.bval = _from_dec(val.num, val.off, _bits(self.prec))
+
+    # a new value from a binary pair with self's settings
+    def _new(self, num, exp):
+        tmp = object.__new__(type(self))
+        (tmp.bval, tmp.prec, tmp.trim_on, tmp.rounding, tmp.rep) = (Ival(num, exp), self.prec, self.trim_on, getcontext().rounding, None)
+        return tmp.trim()
+
+    # display trim -- no side effects on self
+    def dtrim(self, prec=None, rounding=None):
+        prec = self.prec if prec is None else prec
+        rounding = self.rounding if rounding is None else rounding
+        if not isinstance(prec, int) or prec <= 0:
+            raise TypeError('Only positive integers allowed')
+        if rounding not in _ROUNDINGS:
+            raise ValueError('Only {} allowed'.format(_ROUNDINGS))
+        bval = _bchop(*self.bval, _bits(prec), rounding)
+        if bval.off == self.bval.off and prec >= self.prec:
+            return self
+        # shown at prec digits -- not self's, which would print the binary tail
+        tmp = type(self)(0, **dict(self.kwargs, prec=min(prec, self.prec)))
+        tmp.bval = bval
+        return tmp
+
+    # in-place trim to precision -- side effects
+    def trim(self, prec=None, rounding=None):
+        if not self.trim_on:
+            return self
+        if self._frozen or prec is not None or rounding is not None:
+            trm = self.dtrim(prec=prec, rounding=rounding)
+            if self._frozen:
+                return trm
+            self.bval = trm.bval
+            return self
+        self.bval = _bchop(*self.bval, _bits(self.prec), self.rounding)
+        return self
+
+    # rebuild from raw (binary) state -- no parsing, no trim (pickling and ibcodec)
+    @classmethod
+    def _restore(cls, num, exp, prec, trim_on, rounding, rep, frozen):
+        tmp = object.__new__(cls)
+        (tmp.bval, tmp.prec, tmp.trim_on, tmp.rounding, tmp.rep) = (Ival(num, exp), prec, trim_on, rounding, rep)
+        if frozen:
+            tmp._frozen = True
+        return tmp
+
+    def __reduce__(self):
+        return (type(self)._restore, (self.bval.num, self.bval.off, self.prec, self.trim_on, self.rounding, self.rep, self._frozen))
+
+    # exact -- no set bits below the binary point
+    @property
+    def isint(self):
+        (num, exp) = self.bval
+        return exp <= 0 or num & ((1 << exp) - 1) == 0
+
+    # exact value of a float (its binary fraction n/2**k)
+    @classmethod
+    def from_float(cls, val, prec=None, trim_on=None):
+        (num, den) = float(val).as_integer_ratio()
+        return cls._make(num, den.bit_length() - 1, prec=prec, trim_on=trim_on)
+
+    # decimal only here, rounded to prec digits -- trailing zeros dropped, as a decimal
+    # IBReal parsed from the same text would show
+    @property
+    def _repr(self):
+        if self.rep is not None:
+            return self.rep
+        (num, off) = self.ival
+        (num, off) = IBReal._restore(num, off, self.prec, True, ROUND_HALF_EVEN, None, False).dtrim().ival
+        txt = str(abs(num))
+        zeros = len(txt) - len(txt.rstrip('0')) if num else 0
+        if zeros:
+            num = int(txt[:-zeros]) * (-1 if num < 0 else 1)
+        return IBReal._restore(num, off-zeros, self.prec, True, ROUND_HALF_EVEN, None, False)._repr
+
+    # radix hooks (see IBReal) -- bits and shifts
+    @property
+    def _raw(self):
+        return self.bval
+
+    @classmethod
+    def _make(cls, num, exp, **kwargs):
+        tmp = cls(0, **kwargs)
+        tmp.bval = Ival(num, exp)
+        return tmp.trim()
+
+    @staticmethod
+    def _rlen(num):
+        return num.bit_length()
+
+    @staticmethod
+    def _up(num, k):
+        return num << k
+
+    @staticmethod
+    def _down(num, k):
+        return num >> k
+
+    @staticmethod
+    def _units(prec):
+        return _bits(prec)
+
+    def _take(self, other):
+        if isinstance(other, IBBinReal):
+            self.bval = other.bval
+        else:
+            self.ival = other.ival
+        return self
+
+    def __mul__(self, other):
+        try:
+            if not isinstance(other, IBBinReal):
+                other = type(self)(other, **self.kwargs)
+        except Exception:
+            return other.__rmul__(self)
+        (a, ea) = self.bval
+        (b, eb) = other.bval
+        if _stats.on:
+            _stats.op('mul', a, b)
+        return self._new(a*b, ea+eb)
+
+    def __truediv__(self, other):
+        try:
+            if not isinstance(other, IBBinReal):
+                other = type(self)(other, **self.kwargs)
+        except Exception:
+            return other.__rtruediv__(self)
+        (a, ea) = self.bval
+        (b, eb) = other.bval
+        if b == 0:
+            raise ZeroDivisionError('division by zero')
+        if _stats.on:
+            _stats.op('div', a, b)
+        keep = _bits(self.prec) + 2
+        if self.prec >= self.newton_prec and b.bit_length() >= _bits(self.newton_prec):
+            return self._recip_div(a, ea, b, eb, keep)
+        s = keep + b.bit_length() - a.bit_length()
+        num = (a << s) // b if s >= 0 else a // (b << -s)
+        return self._new(num, ea - eb + s)
+
+    # a/b as a times the (cached) reciprocal of b's leading bits
+    def _recip_div(self, a, ea, b, eb, keep):
+        (a, ea) = _bchop(a, ea, keep)
+        (b, eb) = _bchop(b, eb, keep)
+        (x, k) = _brecip(abs(b), keep)
+        t = abs(a).bit_length() + 32
+        num = abs(a) * x >> t
+        return self._new(num if (a < 0) == (b < 0) else -num, k - t + ea - eb)
+
+    def __add__(self, other):
+        try:
+            if not isinstance(other, IBBinReal):
+                other = type(self)(other, **self.kwargs)
+        except Exception:
+            return other.__radd__(self)
+        (a, ea) = self.bval
+        (b, eb) = other.bval
+        if ea >= eb:
+            return self._new(a + (b << (ea-eb)), ea)
+        return self._new((a << (eb-ea)) + b, eb)
+
+    def __sub__(self, other):
+        try:
+            if not isinstance(other, IBBinReal):
+                other = type(self)(other, **self.kwargs)
+        except Exception:
+            return other.__rsub__(self)
+        (a, ea) = self.bval
+        (b, eb) = other.bval
+        if ea >= eb:
+            return self._new(a - (b << (ea-eb)), ea)
+        return self._new((a << (eb-ea)) - b, eb)
+
+    # integer power by square-and-multiply on the raw mantissa (see IBReal.ipow)
+    def ipow(self, n):
+        n = int(n)
+        (num, exp) = self.bval
+        (rnum, rexp) = (1, 0)
+        keep = _bits(self.prec + n.bit_length()//3 + 3)
+        cnt = abs(n)
+        while cnt:
+            if cnt & 1:
+                (rnum, rexp) = (rnum*num, rexp+exp)
+                if self.trim_on:
+                    (rnum, rexp) = _bchop(rnum, rexp, keep)
+            cnt >>= 1
+            if cnt:
+                (num, exp) = (num*num, exp+exp)
+                if self.trim_on:
+                    (num, exp) = _bchop(num, exp, keep)
+        tmp = self._new(rnum, rexp)
+        if n < 0:
+            tmp = type(self)(1, **self.kwargs).__truediv__(tmp)
+        return tmp
+
+    # truncated toward zero, exactly
+    def __int__(self):
+        (num, exp) = self.bval
+        if exp <= 0:
+            return num << -exp
+        tmp = abs(num) >> exp
+        return -tmp if num < 0 else tmp
+
+    # correctly rounded (int/int true division rounds once)
+    def __float__(self):
+        (num, exp) = self.bval
+        if exp <= 0:
+            return float(num << -exp)
+        return num / (1 << exp)
+
+    def __neg__(self):
+        return self._new(-self.bval.num, self.bval.off)
+
+    def __abs__(self):
+        return self._new(abs(self.bval.num), self.bval.off)
+
+    # three-way compare on bit lengths, then shifted mantissas
+    # a decimal IBReal is compared exactly against self's decimal pair
+    def _cmp(self, other):
+        if not isinstance(other, IBReal):
+            other = type(self)(other, **self.kwargs)
+        elif not isinstance(other, IBBinReal):
+            (num, off) = self.ival
+            return IBReal._restore(num, off, self.prec, False, self.rounding, None, False)._cmp(other)
+        (snum, sexp) = self.bval
+        (onum, oexp) = other.bval
+        if sexp == oexp:
+            return (snum > onum) - (snum < onum)
+        ssgn = (snum > 0) - (snum < 0)
+        osgn = (onum > 0) - (onum < 0)
+        if ssgn != osgn or ssgn == 0:
+            return (ssgn > osgn) - (ssgn < osgn)
+        # 2**(mag-1) <= abs(value) < 2**mag
+        smag = abs(snum).bit_length() - sexp
+        omag = abs(onum).bit_length() - oexp
+        if smag != omag:
+            return ssgn if smag > omag else -ssgn
+        if sexp > oexp:
+            onum <<= sexp - oexp
+        else:
+            snum <<= oexp - sexp
+        return (snum > onum) - (snum < onum)
+
+    # abs(self) < 10**-exp -- bit length first, exact compare when close
+    def is_below(self, exp):
+        (num, bexp) = self.bval
+        if num == 0:
+            return True
+        mag = abs(num).bit_length() - bexp
+        lim = -exp * 3321928 // 1000000
+        if mag <= lim - 2:
+            return True
+        if mag >= lim + 3:
+            return False
+        (lhs, rhs) = (abs(num) << max(-bexp, 0), 1 << max(bexp, 0))
+        if exp >= 0:
+            return lhs * _pow10(exp) < rhs
+        return lhs < rhs * _pow10(-exp)
@@ -0,0 +1,125 @@
+import struct
+from .ibcontext import ROUND_TRUNC, ROUND_HALF_EVEN
+
+# binary records (little-endian)
+#   real:    tag b'R', flags, prec, offset, mantissa length, [rep length, rep], mantissa bytes
+#            (tag b'B' for a binary-radix IBBinReal -- offset is then the binary exponent)
+#   complex: tag b'C', flags, prec, [rep length, rep], real record, imaginary record
+#   sequence: magic, count, records back to back
+_REAL = struct.Struct('<cBqqQ')
+_COMP = struct.Struct('<cBq')
+_REP = struct.Struct('<H')
+_SEQ = struct.Struct('<4sQ')
+_MAGIC = b'IBRB'
+_REALTAGS = (b'R', b'B')
+
+# flag bits
+_NEG = 1
+_TRIM = 2
+_FROZEN = 4
+_HALF_EVEN = 8
+_HASREP = 16
+
+def _flags(val):
+    flags = _TRIM if val.trim_on else 0
+    flags |= _FROZEN if val._frozen else 0
+    flags |= _HASREP if val.rep is not None else 0
+    return flags
+
+def _pack_rep(val):
+    if val.rep is None:
+        return b''
+    rep = str(val.rep).encode()
+    return _REP.pack(len(rep)) + rep
+
+def _unpack_rep(buf, pos, flags):
+    if not flags & _HASREP:
+        return (None, pos)
+    (rlen,) = _REP.unpack_from(buf, pos)
+    pos += _REP.size
+    return (bytes(buf[pos:pos+rlen]).decode(), pos + rlen)
+
+def _pack_real(val):
+    (num, off) = val._raw
+    blen = (abs(num).bit_length() + 7) // 8
+    flags = _flags(val) | (_NEG if num < 0 else 0) | (_HALF_EVEN if val.rounding == ROUND_HALF_EVEN else 0)
+    head = _REAL.pack(val._tag, flags, val.prec, off, blen)
+    return head + _pack_rep(val) + abs(num).to_bytes(blen, 'little')
+
+def _pack_comp(val):
+    head = _COMP.pack(b'C', _flags(val), val.prec)
+    return head + _pack_rep(val) + _pack_real(val.rcomp) + _pack_real(val.icomp)
+
+# (value, position after it)
+def _unpack_real(buf, pos, cls):
+    (_, flags, prec, off, blen) = _REAL.unpack_from(buf, pos)
+    (rep, pos) = _unpack_rep(buf, pos + _REAL.size, flags)
+    if pos + blen > len(buf):
+        raise ValueError('Truncated IBReal record')
+    num = int.from_bytes(buf[pos:pos+blen], 'little')
+    rounding = ROUND_HALF_EVEN if flags & _HALF_EVEN else ROUND_TRUNC
+    val = cls._restore(-num if flags & _NEG else num, off, prec, bool(flags & _TRIM), rounding, rep, bool(flags & _FROZEN))
+    return (val, pos + blen)
+
+def _unpack_comp(buf, pos, cls):
+    (_, flags, prec) = _COMP.unpack_from(buf, pos)
+    (rep, pos) = _unpack_rep(buf, pos + _COMP.size, flags)
+    (rcmp, pos) = _unpack_one(buf, pos, _REALTAGS)
+    (icmp, pos) = _unpack_one(buf, pos, _REALTAGS)
+    return (cls._restore(rcmp, icmp, prec, bool(flags & _TRIM), rep, bool(flags & _FROZEN)), pos)
+
+def _unpack_one(buf, pos, want=None, cls=None):
+    if pos >= len(buf):
+        raise ValueError('Truncated record')
+    tag = bytes(buf[pos:pos+1])
+    if want is not None and tag not in (want if isinstance(want, tuple) else (want,)):
+        raise ValueError('Expected {} record, found {}'.format(want, tag))
+    if tag == b'R':
+        return _unpack_real(buf, pos, cls or R)
+    if tag == b'B':
+        return _unpack_real(buf, pos, cls or B)
+    if tag == b'C':
+        return _unpack_comp(buf, pos, cls or C)
+    raise ValueError('Unknown record tag {}'.format(tag))
+
+# one IBReal or IBComp as bytes
+def pack(val):
+    if isinstance(val, R):
+        return _pack_real(val)
+    if isinstance(val, C):
+        return _pack_comp(val)
+    raise TypeError('Only IBReal or IBComp allowed')
+
+# inverse of pack -- want is b'R', b'B' or b'C' (or a tuple of them) to insist on a type
+def unpack(data, want=None, cls=None):
+    buf = memoryview(data)
+    (val, pos) = _unpack_one(buf, 0, want, cls)
+    if pos != len(buf):
+        raise ValueError('{} trailing bytes'.format(len(buf) - pos))
+    return val
+
+# a sequence of IBReal/IBComp values as one buffer
+def encode(vals):
+    recs = [pack(i) for i in vals]
+    return _SEQ.pack(_MAGIC, len(recs)) + b''.join(recs)
+
+# inverse of encode -- a list
+def decode(data):
+    buf = memoryview(data)
+    if len(buf) < _SEQ.size:
+        raise ValueError('Not an encoded sequence')
+    (magic, count) = _SEQ.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError('Not an encoded sequence')
+    (vals, pos) = ([], _SEQ.size)
+    for _ in range(count):
+        (val, pos) = _unpack_one(buf, pos)
+        vals.append(val)
+    if pos != len(buf):
+        raise ValueError('{} trailing bytes'.format(len(buf) - pos))
+    return vals
+
+# here to prevent circular import
+from .ibreal import IBReal as R
+from .ibcomp import IBComp as C
+from .ibbinary import IBBinReal as B
@@ -1,4 +1,5 @@
-from os import environ
+from .ibcontext import getcontext, ROUND_HALF_EVEN
+from .ibstats import ib_stats as _stats
 
 # arbitrary-precision complex number
 class IBComp:
@@ -7,25 +8,30 @@ class IBComp:
     same operations IBReal offers.
 
     Usage:
-    comp = IBComp(raw, prec=None, trim_on=True, rep=None)
+    comp = IBComp(raw, prec=None, trim_on=None, rep=None, radix=None)
 
     raw: tuple of rcomp & icomp, IBReal object, Ival object, number, string, or 2-tuple
 
     rep: any special name for this number
 
-    $ export IBR_DEF_PREC=450 :: set environment var to pick up global precision
+    radix: radix of the components built here (10 or 2, see IBReal)
+
+    prec and trim_on default to the current ibcontext. radix follows an IBReal/IBComp raw, else the context.
+
+    $ export IBR_DEF_PREC=450 :: set environment var to pick up global precision (read once, at import)
     """
-    def __init__(self, raw, prec=None, trim_on=True, rep=None):
-        if prec is not None:
-            self.prec = prec
-        elif 'IBR_DEF_PREC' in environ:
-            # precision from environment
-            self.prec = int(environ['IBR_DEF_PREC'])
-        else:
-            # default without environment var
-            self.prec = 50 
-        self.trim_on = trim_on
+    # frozen instances never change value -- in-place ops and trim hand back new objects
+    _frozen = False
+
+    def __init__(self, raw, prec=None, trim_on=None, rep=None, radix=None):
+        ctx = getcontext()
+        self.prec = ctx.prec if prec is None else prec
+        self.trim_on = ctx.trim_on if trim_on is None else trim_on
         self.rep = rep
+        if radix is None:
+            first = raw[0] if isinstance(raw, tuple) or isinstance(raw, list) else raw
+            radix = first._radix if isinstance(first, R) else raw.radix if isinstance(raw, IBComp) else ctx.radix
+        self.radix = radix
         try:
             # 2-tuple/list representing real and imaginary components. each coerced into IBReal
             if isinstance(raw, tuple) or isinstance(raw, list):
@@ -38,46 +44,59 @@ class IBComp:
             # an integer
             elif isinstance(raw, int):
                 self.rcomp = R(raw, **self.kwargs)
-                self.icomp = R((0, 0), **self.kwargs)
+                self.icomp = ib_const((0, 0), **self.kwargs)
             # an IBReal instance
             elif isinstance(raw, R):
                 self.rcomp = raw
-                self.icomp = R((0, 0), **raw.kwargs)
+                self.icomp = ib_const((0, 0), **raw.kwargs)
             # something else -- text or float
             else:
                 (self.rcomp, self.icomp) = self._from_raw(str(raw))
         except Exception as e:
             raise ValueError('Failed to coerce {}:{} to IBReal pair'.format(type(raw), raw)) from e
 
+    # make read-only (see _frozen) -- components included
+    def freeze(self):
+        self.rcomp = type(self.rcomp)(self.rcomp, **self.rcomp.kwargs).freeze()
+        self.icomp = type(self.icomp)(self.icomp, **self.icomp.kwargs).freeze()
+        self._frozen = True
+        return self
+
     @property
     def kwargs(self):
-        return {'prec':self.prec, 'trim_on':self.trim_on}
+        return {'prec':self.prec, 'trim_on':self.trim_on, 'radix':self.radix}
+
+    # rebuild from components as they are (pickling and ibcodec)
+    @classmethod
+    def _restore(cls, rcomp, icomp, prec, trim_on, rep, frozen):
+        tmp = cls.__new__(cls)
+        (tmp.rcomp, tmp.icomp, tmp.prec, tmp.trim_on, tmp.rep) = (rcomp, icomp, prec, trim_on, rep)
+        tmp.radix = rcomp._radix
+        if frozen:
+            tmp._frozen = True
+        return tmp
+
+    def __reduce__(self):
+        return (type(self)._restore, (self.rcomp, self.icomp, self.prec, self.trim_on, self.rep, self._frozen))
+
+    # compact binary form (see ibcodec)
+    def to_bytes(self):
+        return pack(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return unpack(data, b'C', cls)
 
     # length (in complex plane) of self
     @property
     def length(self):
-        two = R((2, 0), **self.kwargs)
-        slen = self.rcomp**two + self.icomp**two
-        return ib_sqrt(slen)
+        return ib_sqrt(self.abs2())
 
     # angle (in complex plane) of self
-    # returned in canonical form (-pi < theta < pi)
-    # !!slow near tan(theta) = 1
+    # returned in canonical form (-pi < theta <= pi)
     @property
     def theta(self):
-        zero = R((0, 0), **self.kwargs)
-        two = R((2, 0), **self.kwargs)
-        mypi = ib_pi(**self.kwargs)
-        my2pi = two * mypi
-        if self.rcomp == zero:
-            return ib_sgn(self.icomp)*mypi/two
-        th = ib_arctan(self.icomp/self.rcomp)
-        if self.rcomp < zero:
-            th = th + mypi
-        while abs(th) > mypi:
-            # return canonical form
-            th -= ib_sgn(th)*my2pi
-        return th
+        return ib_atan2(self.icomp, self.rcomp)
 
     @property
     def _repr(self):
@@ -101,6 +120,8 @@ class IBComp:
     # in-place trim to precision -- side effects
     def trim(self, prec):
         trm = self.dtrim(prec=prec)
+        if self._frozen:
+            return trm
         (self.rcomp, self.icomp) = (trm.rcomp, trm.icomp)
         return self
 
@@ -110,113 +131,259 @@ class IBComp:
         plus = val.find('+')
         eye = val.find('i')
         if plus == -1 and eye == -1: #real number
-            return (R(val, **self.kwargs), R((0, 0), **self.kwargs))
+            return (R(val, **self.kwargs), ib_const((0, 0), **self.kwargs))
         elif plus == -1 and eye != -1: #imag number
             if val in ('i', '-i'): #allow bare-i notation
                 val = val.replace('i', '1')
             else:
                 val = val[:eye]
-            return (R((0, 0), **self.kwargs), R(val, **self.kwargs))
+            return (ib_const((0, 0), **self.kwargs), R(val, **self.kwargs))
         elif plus != -1 and eye != -1: #comp number
             return (R(val[:plus], **self.kwargs), R(val[plus+1:eye], **self.kwargs))
 
+    # Gauss 3-multiply product on the aligned component mantissas -- one trim per component
     def __mul__(self, other):
+        (kind, a, b, off) = self._kpair()
         if not isinstance(other, type(self)):
-            rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
-            other = type(self)((rcmp, icmp), **self.kwargs)
-        rcmp = R(self.rcomp*other.rcomp-self.icomp*other.icomp, **self.rcomp.kwargs)
-        icmp = R(self.rcomp*other.icomp+self.icomp*other.rcomp, **self.icomp.kwargs)
-        return type(self)((rcmp, icmp), **self.kwargs)
+            oiv = kind._of(other, **self.rcomp.kwargs)._raw
+            if _stats.on:
+                _stats.op('cmul', a, b, oiv.num)
+            return self._from_ipair(a*oiv.num, b*oiv.num, off+oiv.off, kind)
+        (_, c, d, ooff) = other._kpair(kind)
+        if _stats.on:
+            _stats.op('cmul', a, b, c, d)
+        k1 = c * (a + b)
+        k2 = a * (d - c)
+        k3 = b * (c + d)
+        return self._from_ipair(k1 - k3, k1 + k2, off+ooff, kind)
 
     def __rmul__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return other.__mul__(self)
 
     def __imul__(self, other):
         other = self.__mul__(other)
+        if self._frozen:
+            return other
         (self.rcomp, self.icomp) = (other.rcomp, other.icomp)
         return self
 
+    # (a+bi)(c-di) / (c**2 + d**2) on the aligned component mantissas
     def __truediv__(self, other):
+        (kind, a, b, off) = self._kpair()
+        keep = kind._units(self.prec + 3)
         if not isinstance(other, type(self)):
-            rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
-            other = type(self)((rcmp, icmp), **self.kwargs)
-        numer = self * other.conj
-        denom = (other * other.conj).rcomp
-        rcmp = numer.rcomp / denom
-        icmp = numer.icomp / denom
-        return type(self)((rcmp, icmp), **self.kwargs)
+            oiv = kind._of(other, **self.rcomp.kwargs)._raw
+            if _stats.on:
+                _stats.op('cdiv', a, b, oiv.num)
+            den = (oiv.num, oiv.off)
+            return self._from_parts(self._div_part((a, off), den, keep, kind),
+                                    self._div_part((b, off), den, keep, kind), kind)
+        (_, c, d, ooff) = other._kpair(kind)
+        if _stats.on:
+            _stats.op('cdiv', a, b, c, d)
+        k1 = c * (a + b)
+        k2 = a * (c + d)
+        k3 = b * (c - d)
+        den = (c*c + d*d, 2*ooff)
+        return self._from_parts(self._div_part((k1 - k3, off+ooff), den, keep, kind),
+                                self._div_part((k1 - k2, off+ooff), den, keep, kind), kind)
 
     def __itruediv__(self, other):
         other = self.__truediv__(other)
+        if self._frozen:
+            return other
         (self.rcomp, self.icomp) = (other.rcomp, other.icomp)
         return self
 
     def __rtruediv__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return other.__truediv__(self)
 
     def __add__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return type(self)((self.rcomp+other.rcomp, self.icomp+other.icomp), **self.kwargs)
 
     def __radd__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return other.__add__(self)
 
     def __iadd__(self, other):
         other = self.__add__(other)
+        if self._frozen:
+            return other
         (self.rcomp, self.icomp) = (other.rcomp, other.icomp)
         return self
 
     def __sub__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return type(self)((self.rcomp-other.rcomp, self.icomp-other.icomp), **self.kwargs)
 
     def __rsub__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return other.__sub__(self)
 
     def __isub__(self, other):
         other = self.__sub__(other)
+        if self._frozen:
+            return other
         (self.rcomp, self.icomp) = (other.rcomp, other.icomp)
         return self
 
+    # integer power by square-and-multiply on the raw component mantissas
+    # intermediates carry guard digits; only the result is trimmed
+    # (__pow__ keeps its multiply loop for the series expansions)
+    def ipow(self, n):
+        n = int(n)
+        (kind, a, b, off) = self._kpair()
+        # components are separate parts, each cut to its own length, so a much
+        # smaller one keeps its digits
+        (x, y) = ((a, off), (b, off))
+        (c, d) = ((1, 0), (0, 0))
+        trim_on = self.rcomp.trim_on and self.icomp.trim_on
+        keep = kind._units(self.prec + n.bit_length()//3 + 3) if trim_on else None
+        exp = abs(n)
+        while exp:
+            if exp & 1:
+                (c, d) = (self._sum_parts((self._pmul(x, c), self._pmul(y, d, -1)), keep, kind),
+                          self._sum_parts((self._pmul(x, d), self._pmul(y, c)), keep, kind))
+            exp >>= 1
+            if exp:
+                (x, y) = (self._sum_parts((self._pmul(x, x), self._pmul(y, y, -1)), keep, kind),
+                          self._sum_parts((self._pmul(x, y, 2),), keep, kind))
+        tmp = self._from_parts(c, d, kind)
+        if n < 0:
+            return tmp.reciprocal()
+        return tmp
+
+    # self**2 with two multiplies on the aligned component mantissas
+    def square(self):
+        (kind, a, b, off) = self._kpair()
+        return self._from_ipair((a+b) * (a-b), 2*a*b, 2*off, kind)
+
+    # squared modulus (IBReal) -- no square root
+    def abs2(self):
+        (kind, a, b, off) = self._kpair()
+        return kind._make(a*a + b*b, 2*off, **self.rcomp.kwargs)
+
+    # 1/self = (a-bi) / (a**2 + b**2)
+    def reciprocal(self):
+        (kind, a, b, off) = self._kpair()
+        keep = kind._units(self.prec + 3)
+        den = (a*a + b*b, 2*off)
+        return self._from_parts(self._div_part((a, off), den, keep, kind),
+                                self._div_part((-b, off), den, keep, kind), kind)
+
+    # aligned decimal component mantissas (rnum, inum, off)
+    def _ipair(self):
+        (siv, oiv) = self.rcomp._align(self.rcomp.ival, self.icomp.ival)
+        return (siv.num, oiv.num, siv.off)
+
+    # (kind, rnum, inum, off): aligned component mantissas in the radix of kind, the
+    # components' real class -- mixed-radix components (or a kind other than theirs) use decimal
+    def _kpair(self, kind=None):
+        if kind is None:
+            kind = type(self.rcomp) if self.rcomp._radix == self.icomp._radix else R
+        if self.rcomp._radix != kind._radix or self.icomp._radix != kind._radix:
+            if kind._radix != 10:
+                (a, b) = (kind._of(self.rcomp, **self.rcomp.kwargs)._raw, kind._of(self.icomp, **self.icomp.kwargs)._raw)
+            else:
+                return (kind,) + self._ipair()
+        else:
+            (a, b) = (self.rcomp._raw, self.icomp._raw)
+        if a.off > b.off:
+            return (kind, a.num, kind._up(b.num, a.off-b.off), a.off)
+        return (kind, kind._up(a.num, b.off-a.off), b.num, b.off)
+
+    # raw parts: a part is a pair (num, off) worth num * kind._radix**-off, kind being the
+    # real class whose radix (10 or 2) the mantissas are in -- off may be negative. keep
+    # counts units of that radix (digits or bits), i.e. kind._units(prec + guard)
+
+    # sum of parts as one part -- the offset leaves about keep units in the largest part
+    # (exact if keep is None), never finer than the finest part's; parts more than keep
+    # units below the largest vanish, each truncated toward zero
+    @staticmethod
+    def _sum_parts(parts, keep, kind):
+        parts = [i for i in parts if i[0]]
+        if not parts:
+            return (0, 0)
+        to = max(i[1] for i in parts)
+        if keep is not None:
+            to = min(to, keep - max(kind._rlen(abs(num)) - off for (num, off) in parts))
+        tot = 0
+        for (num, off) in parts:
+            if off > to:
+                tmp = kind._down(abs(num), off - to)
+                tot += -tmp if num < 0 else tmp
+            else:
+                tot += kind._up(num, to - off)
+        return (tot, to)
+
+    # product of two parts, times an integer scale -- exact
+    @staticmethod
+    def _pmul(x, y, scale=1):
+        return (scale * x[0] * y[0], x[1] + y[1])
+
+    # one quotient component: part / den (both parts, den nonzero) as a part with
+    # keep or keep+1 units of its own, truncated toward zero -- under ROUND_HALF_EVEN
+    # (self's rounding) one more unit, nonzero if anything was left over, so the
+    # closing trim rounds as IBReal.__truediv__ does
+    def _div_part(self, part, den, keep, kind):
+        ((num, off), (n, no)) = (part, den)
+        if num == 0:
+            return (0, 0)
+        exp = keep + kind._rlen(abs(n)) - kind._rlen(abs(num))
+        (quo, rem) = divmod(kind._up(abs(num), max(exp, 0)), kind._up(abs(n), max(-exp, 0)))
+        if self.rcomp.rounding == ROUND_HALF_EVEN:
+            (quo, exp) = (kind._up(quo, 1) + (rem != 0), exp + 1)
+        return (-quo if (num < 0) != (n < 0) else quo, exp + off - no)
+
+    # build from raw component parts, each with its own offset (in the radix of kind)
+    def _from_parts(self, rpart, ipart, kind):
+        rcmp = kind._make(*rpart, **self.rcomp.kwargs)
+        icmp = kind._make(*ipart, **self.icomp.kwargs)
+        return type(self)((rcmp, icmp), **self.kwargs)
+
+    # build from raw component mantissas sharing one offset (in the radix of kind)
+    def _from_ipair(self, rnum, inum, off, kind=None):
+        kind = R if kind is None else kind
+        rcmp = kind._make(rnum, off, **self.rcomp.kwargs)
+        icmp = kind._make(inum, off, **self.icomp.kwargs)
+        return type(self)((rcmp, icmp), **self.kwargs)
+
     def __pow__(self, other):
         if not isinstance(other, type(self)) and not isinstance(other, R):
             other = R(other, **self.kwargs)
         tmp = type(self)((self.rcomp, self.icomp), **self.kwargs)
         if other == 0:
-            tmp.rcomp = R((1, 0), **self.rcomp.kwargs)
-            tmp.icomp = R((0, 0), **self.icomp.kwargs)
+            tmp.rcomp = ib_const((1, 0), **self.rcomp.kwargs)
+            tmp.icomp = ib_const((0, 0), **self.icomp.kwargs)
             return tmp
         if isinstance(other, R) and other.isint:
             # !! Leave int section alone -- needed for series expansions
             for _ in range(1, abs(int(other))):
                 tmp *= self
             if other < 0:
-                rcmp = R((1, 0), **self.rcomp.kwargs)
-                icmp = R((0, 0), **self.icomp.kwargs)
+                rcmp = ib_const((1, 0), **self.rcomp.kwargs)
+                icmp = ib_const((0, 0), **self.icomp.kwargs)
                 return type(self)((rcmp, icmp), **self.kwargs).__truediv__(tmp)
         else:
             sl = ib_log(tmp)
@@ -230,13 +397,15 @@ class IBComp:
 
     def __ipow__(self, val):
         other = self.__pow__(val)
+        if self._frozen:
+            return other
         (self.rcomp, self.icomp) = (other.rcomp, other.icomp)
         return self
 
     def __eq__(self, other):
         if not isinstance(other, type(self)):
             rcmp = R(other, **self.rcomp.kwargs)
-            icmp = R((0, 0), **self.icomp.kwargs)
+            icmp = ib_const((0, 0), **self.icomp.kwargs)
             other = type(self)((rcmp, icmp), **self.kwargs)
         return self.rcomp == other.rcomp and self.icomp == other.icomp
 
@@ -251,4 +420,5 @@ class IBComp:
 
 # here to prevent circular import
 from .ibreal import IBReal as R
-from .ibfuncs import ib_sqrt, ib_arctan, ib_pi, ib_sin, ib_cos, ib_log, ib_exp, ib_sgn
+from .ibfuncs import ib_const, ib_sqrt, ib_atan2, ib_log, ib_exp
+from .ibcodec import pack, unpack
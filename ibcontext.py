@@ -0,0 +1,90 @@
+from contextvars import ContextVar
+from os import environ
+
+# trim rounding modes
+ROUND_TRUNC = 'trunc'
+ROUND_HALF_EVEN = 'half_even'
+_ROUNDINGS = (ROUND_TRUNC, ROUND_HALF_EVEN)
+
+# internal radix of new IBReals -- decimal Ival offsets or binary exponents
+_RADIXES = (10, 2)
+
+# precision/trim settings picked up by IBReal and IBComp construction
+class IBContext:
+    """
+    IBContext holds the defaults used when an IBReal or IBComp is built without explicit settings,
+    in the spirit of decimal's contexts.
+
+    Usage:
+    ctx = IBContext(prec=50, trim_on=True, rounding=ROUND_TRUNC, radix=10)
+
+    prec: precision -- length limit of internal integer
+
+    trim_on: allow trimming or not
+
+    rounding: ROUND_TRUNC or ROUND_HALF_EVEN, applied when trimming
+
+    radix: 10 (decimal offsets) or 2 (binary exponents, see ibbinary) for IBReals built without one
+
+    The process-wide default starts from $IBR_DEF_PREC (read once, at import). Each thread or task
+    can override it without touching anyone else's numbers:
+
+    with localcontext(prec=450):
+        ...
+    """
+    def __init__(self, prec=50, trim_on=True, rounding=ROUND_TRUNC, radix=10):
+        if not isinstance(prec, int) or prec <= 0:
+            raise TypeError('Only positive integers allowed')
+        if rounding not in _ROUNDINGS:
+            raise ValueError('Only {} allowed'.format(_ROUNDINGS))
+        if radix not in _RADIXES:
+            raise ValueError('Only radix {} allowed'.format(_RADIXES))
+        self.prec = prec
+        self.trim_on = trim_on
+        self.rounding = rounding
+        self.radix = radix
+
+    def copy(self):
+        return type(self)(self.prec, self.trim_on, self.rounding, self.radix)
+
+    def __repr__(self):
+        return 'IBContext(prec={}, trim_on={}, rounding={!r}, radix={})'.format(self.prec, self.trim_on, self.rounding, self.radix)
+
+# process-wide default and the per-thread/per-task override
+_default_context = IBContext(prec=int(environ.get('IBR_DEF_PREC', 50)))
+_current_context = ContextVar('ib_context', default=None)
+
+# context in effect for this thread/task
+def getcontext():
+    ctx = _current_context.get()
+    return _default_context if ctx is None else ctx
+
+# replace the context for this thread/task
+def setcontext(ctx):
+    if not isinstance(ctx, IBContext):
+        raise TypeError('Only IBContext allowed')
+    _current_context.set(ctx)
+
+# process-wide default (what threads and tasks without an override see)
+def getdefaultcontext():
+    return _default_context
+
+# scope a copy of the current (or given) context to a block
+# i.e. with localcontext(prec=450) as ctx: ...
+class localcontext:
+    def __init__(self, ctx=None, **kwargs):
+        self.ctx = (getcontext() if ctx is None else ctx).copy()
+        for (key, val) in kwargs.items():
+            if not hasattr(self.ctx, key):
+                raise AttributeError('No context setting {}'.format(key))
+            setattr(self.ctx, key, val)
+        # re-validate
+        self.ctx = self.ctx.copy()
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current_context.set(self.ctx)
+        return self.ctx
+
+    def __exit__(self, *args, **kwargs):
+        _current_context.reset(self.token)
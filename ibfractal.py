@@ -0,0 +1,269 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import ldexp
+from os import cpu_count
+from .ibcontext import getcontext
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from .ibreal import IBReal as R
+from .ibcomp import IBComp as C
+from .ibfuncs import _fx_from_real
+
+# iterations before z = z**2 + c leaves the bailout circle (maxiter if it never does)
+# all values are fixed-point integers scaled by pad; bail is bailout**2 at pad**2
+# periodicity: z is compared to a saved orbit point refreshed at doubling intervals (Brent)
+def _escape(zr, zi, cr, ci, pad, bail, maxiter, tol):
+    (sr, si, window) = (zr, zi, 8)
+    for idx in range(maxiter):
+        zr2 = zr * zr
+        zi2 = zi * zi
+        if zr2 + zi2 > bail:
+            return idx
+        zi = (zr * zi << 1) // pad + ci
+        zr = (zr2 - zi2) // pad + cr
+        if abs(zr - sr) <= tol and abs(zi - si) <= tol:
+            return maxiter
+        if idx == window:
+            (sr, si, window) = (zr, zi, window << 1)
+    return maxiter
+
+# one tile of rows -- runs in a worker process, so ints in and ints out
+# job: (first row, row count, spec) with spec as built by EscapeTime._spec
+def _tile(job):
+    (first, count, spec) = job
+    (kind, cx, cy, step, width, height, jr, ji, pad, bail, maxiter, tol) = spec
+    xs = [cx + step * (2*idx + 1 - width) // 2 for idx in range(width)]
+    rows = []
+    for row in range(first, first + count):
+        y = cy - step * (2*row + 1 - height) // 2
+        if kind == 'mandelbrot':
+            rows.append([_escape(0, 0, x, y, pad, bail, maxiter, tol) for x in xs])
+        else:
+            rows.append([_escape(x, y, jr, ji, pad, bail, maxiter, tol) for x in xs])
+    return rows
+
+# escape-time renderer for the Mandelbrot and Julia sets
+class EscapeTime:
+    """
+    EscapeTime renders Mandelbrot and Julia escape-time images. Pixels are iterated on raw fixed-point
+    integer pairs (no IBReal/IBComp objects per step), bailout uses the squared magnitude, and orbits
+    that settle into a cycle are caught early by periodicity checking. Rows are split into tiles and
+    farmed out over a ProcessPoolExecutor.
+
+    Usage:
+    et = EscapeTime(maxiter=256, bailout=2, prec=None, workers=None, rows=None)
+    counts = et.mandelbrot(center, span, width, height)
+    counts = et.julia(c, center, span, width, height)
+
+    maxiter: iteration limit -- points still bounded after maxiter are reported as maxiter
+
+    bailout: escape radius
+
+    prec: digits kept after the decimal point while iterating (defaults to the ibcontext precision)
+
+    workers: worker processes (defaults to all cores). 1 runs in-process.
+
+    rows: rows per tile (defaults to about four tiles per worker)
+
+    center: IBComp (or anything IBComp accepts) at the middle of the image
+
+    span: real-axis width of the image -- pixels are square
+
+    c: the Julia parameter
+
+    counts is a list of height rows (top row first), each a list of width iteration counts.
+
+    As with any process pool, call from under if __name__ == '__main__' on spawn platforms.
+    """
+    def __init__(self, maxiter=256, bailout=2, prec=None, workers=None, rows=None):
+        self.maxiter = maxiter
+        self.bailout = bailout
+        self.prec = prec
+        self.workers = workers
+        self.rows = rows
+
+    # everything a worker needs, as ints
+    def _spec(self, kind, center, span, width, height, c):
+        wp = getcontext().prec if self.prec is None else self.prec
+        pad = 10**wp
+        center = center if isinstance(center, C) else C(center)
+        (cx, cy) = (_fx_from_real(center.rcomp, wp), _fx_from_real(center.icomp, wp))
+        step = _fx_from_real(span if isinstance(span, R) else R(span), wp) // width
+        if step <= 0:
+            raise ValueError('Span too small for prec {}'.format(wp))
+        (jr, ji) = (0, 0)
+        if c is not None:
+            c = c if isinstance(c, C) else C(c)
+            (jr, ji) = (_fx_from_real(c.rcomp, wp), _fx_from_real(c.icomp, wp))
+        bail = (self.bailout * pad) ** 2
+        # well under a pixel -- orbits this close are the same point for the image
+        tol = step >> 10
+        return (kind, cx, cy, step, width, height, jr, ji, pad, bail, self.maxiter, tol)
+
+    # tile worker (module level, so it pickles)
+    _work = staticmethod(_tile)
+
+    def _render(self, kind, center, span, width, height, c=None):
+        spec = self._spec(kind, center, span, width, height, c)
+        workers = (cpu_count() or 1) if self.workers is None else self.workers
+        rows = self.rows or max(1, -(-height // (4 * workers)))
+        jobs = [(first, min(rows, height - first), spec) for first in range(0, height, rows)]
+        if workers == 1 or len(jobs) == 1:
+            tiles = map(self._work, jobs)
+            return [row for tile in tiles for row in tile]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return [row for tile in pool.map(self._work, jobs) for row in tile]
+
+    def mandelbrot(self, center, span, width, height):
+        return self._render('mandelbrot', center, span, width, height)
+
+    def julia(self, c, center, span, width, height):
+        return self._render('julia', center, span, width, height, c)
+
+# one-shot helpers
+# DeepZoom when deep=True
+def mandelbrot(center, span, width, height, deep=False, **kwargs):
+    return (DeepZoom if deep else EscapeTime)(**kwargs).mandelbrot(center, span, width, height)
+
+def julia(c, center, span, width, height, deep=False, **kwargs):
+    return (DeepZoom if deep else EscapeTime)(**kwargs).julia(c, center, span, width, height)
+
+# deltas for perturbation: dz = w * 2**e per pixel, dc = u * 2**e0 for the image
+# keeps pixel offsets far below 1e-308 in plain floats; w is rescaled before it can overflow
+_RESCALE = 256
+_WMAX = 2.0 ** _RESCALE
+
+# reference orbit from z0 at full precision (fixed-point ints), handed back as floats
+# stops once the orbit escapes -- pixels past its end rebase onto its start
+def _ref_orbit(zr, zi, cr, ci, pad, bail, maxiter):
+    (rr, ri) = ([zr / pad], [zi / pad])
+    for _ in range(maxiter):
+        zr2 = zr * zr
+        zi2 = zi * zi
+        if zr2 + zi2 > bail:
+            break
+        zi = (zr * zi << 1) // pad + ci
+        zr = (zr2 - zi2) // pad + cr
+        rr.append(zr / pad)
+        ri.append(zi / pad)
+    return (rr, ri)
+
+# one pixel against the reference orbit (rr, ri)
+# dz' = 2*Z*dz + dz**2 + dc; when |z| < |dz| (or the orbit runs out) rebase: dz = z - Z0, restart at 0
+def _perturb(wr, wi, e, ur, ui, e0, rr, ri, bail2, maxiter):
+    (m, last) = (0, len(rr) - 1)
+    for idx in range(maxiter):
+        (dr, di) = (ldexp(wr, e), ldexp(wi, e))
+        (zr, zi) = (rr[m] + dr, ri[m] + di)
+        z2 = zr*zr + zi*zi
+        if z2 > bail2:
+            return idx
+        if m == last or z2 < dr*dr + di*di:
+            (wr, wi, e, m) = (zr - rr[0], zi - ri[0], 0, 0)
+        (zr, zi) = (rr[m], ri[m])
+        (sr, si) = (ldexp(ur, e0 - e), ldexp(ui, e0 - e))
+        (wr, wi) = (2*(zr*wr - zi*wi) + ldexp(wr*wr - wi*wi, e) + sr,
+                    2*(zr*wi + zi*wr) + ldexp(2*wr*wi, e) + si)
+        m += 1
+        if e < 0 and (abs(wr) > _WMAX or abs(wi) > _WMAX):
+            shift = min(_RESCALE, -e)
+            (wr, wi, e) = (ldexp(wr, -shift), ldexp(wi, -shift), e + shift)
+    return maxiter
+
+# the same iteration over whole arrays of pixels at once
+def _perturb_np(wr, wi, ur, ui, e0, rr, ri, bail2, maxiter):
+    count = len(wr)
+    res = np.full(count, maxiter, dtype=np.int64)
+    (rr, ri) = (np.asarray(rr), np.asarray(ri))
+    last = len(rr) - 1
+    live = np.arange(count)
+    e = np.full(count, e0, dtype=np.int64)
+    m = np.zeros(count, dtype=np.int64)
+    for idx in range(maxiter):
+        (dr, di) = (np.ldexp(wr, e), np.ldexp(wi, e))
+        (zr, zi) = (rr[m] + dr, ri[m] + di)
+        z2 = zr*zr + zi*zi
+        out = z2 > bail2
+        if out.any():
+            res[live[out]] = idx
+            keep = ~out
+            (live, wr, wi, ur, ui, e, m, dr, di, zr, zi, z2) = (
+                live[keep], wr[keep], wi[keep], ur[keep], ui[keep], e[keep], m[keep],
+                dr[keep], di[keep], zr[keep], zi[keep], z2[keep])
+            if not live.size:
+                break
+        reb = (m == last) | (z2 < dr*dr + di*di)
+        if reb.any():
+            wr = np.where(reb, zr - rr[0], wr)
+            wi = np.where(reb, zi - ri[0], wi)
+            e = np.where(reb, 0, e)
+            m = np.where(reb, 0, m)
+        (zr, zi) = (rr[m], ri[m])
+        (sr, si) = (np.ldexp(ur, e0 - e), np.ldexp(ui, e0 - e))
+        (wr, wi) = (2*(zr*wr - zi*wi) + np.ldexp(wr*wr - wi*wi, e) + sr,
+                    2*(zr*wi + zi*wr) + np.ldexp(2*wr*wi, e) + si)
+        m += 1
+        big = (e < 0) & ((np.abs(wr) > _WMAX) | (np.abs(wi) > _WMAX))
+        if big.any():
+            shift = np.where(big, np.minimum(_RESCALE, -e), 0)
+            (wr, wi, e) = (np.ldexp(wr, -shift), np.ldexp(wi, -shift), e + shift)
+    return res.tolist()
+
+# one tile of rows for DeepZoom
+def _deep_tile(job):
+    (first, count, spec) = job
+    (kind, ustep, e0, width, height, rr, ri, bail2, maxiter, vec) = spec
+    xs = [ustep * (2*idx + 1 - width) / 2 for idx in range(width)]
+    rows = []
+    for row in range(first, first + count):
+        y = -ustep * (2*row + 1 - height) / 2
+        if kind == 'mandelbrot':
+            (wr, wi, ur, ui) = ([0.0] * width, [0.0] * width, xs, [y] * width)
+        else:
+            (wr, wi, ur, ui) = (xs, [y] * width, [0.0] * width, [0.0] * width)
+        if vec:
+            arrs = [np.array(i, dtype=np.float64) for i in (wr, wi, ur, ui)]
+            rows.append(_perturb_np(*arrs, e0, rr, ri, bail2, maxiter))
+        else:
+            rows.append([_perturb(a, b, e0, c, d, e0, rr, ri, bail2, maxiter) for (a, b, c, d) in zip(wr, wi, ur, ui)])
+    return rows
+
+# perturbation renderer for deep zooms
+class DeepZoom(EscapeTime):
+    """
+    DeepZoom is EscapeTime for zooms past what hardware floats (or full-precision iteration of every
+    pixel) can handle. One reference orbit at the image center is computed at full precision; each
+    pixel then iterates only its small offset from that orbit in floats, carried as w * 2**e so that
+    offsets far below 1e-308 survive. Pixels rebase onto the start of the reference orbit whenever
+    they get closer to zero than to the orbit (or outlive it), which avoids perturbation glitches.
+
+    Usage:
+    dz = DeepZoom(maxiter=256, bailout=2, prec=None, workers=None, rows=None, vector=None)
+    counts = dz.mandelbrot(center, span, width, height)
+    counts = dz.julia(c, center, span, width, height)
+
+    prec: digits used for the reference orbit -- must resolve span/width
+
+    vector: iterate each row as NumPy arrays (defaults to True when NumPy is installed)
+
+    Everything else is as for EscapeTime.
+    """
+    def __init__(self, maxiter=256, bailout=2, prec=None, workers=None, rows=None, vector=None):
+        super().__init__(maxiter=maxiter, bailout=bailout, prec=prec, workers=workers, rows=rows)
+        if vector and np is None:
+            raise ImportError('vector=True needs numpy')
+        self.vector = np is not None if vector is None else vector
+
+    _work = staticmethod(_deep_tile)
+
+    def _spec(self, kind, center, span, width, height, c):
+        (_, cx, cy, step, _, _, jr, ji, pad, bail, maxiter, _) = super()._spec(kind, center, span, width, height, c)
+        if kind == 'mandelbrot':
+            (rr, ri) = _ref_orbit(0, 0, cx, cy, pad, bail, maxiter)
+        else:
+            (rr, ri) = _ref_orbit(cx, cy, jr, ji, pad, bail, maxiter)
+        # pixel step as ustep * 2**e0 with ustep near 1
+        e0 = step.bit_length() - pad.bit_length()
+        ustep = (step << -e0) / pad if e0 < 0 else step / (pad << e0)
+        return (kind, ustep, e0, width, height, rr, ri, float(self.bailout)**2, maxiter, self.vector)
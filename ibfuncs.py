@@ -1,28 +1,148 @@
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from functools import wraps
+from math import isqrt
+from threading import Lock
+from time import perf_counter
+from .ibstats import ib_stats as _stats
 
-# key for memoizing -- may be over-specifying key
+# key for memoizing -- raw integers of the call's arguments
 Memo = namedtuple('Memo','id prec trim_on')
 
+# raw, hashable form of a call argument -- no decimal string conversion
+# (tagged by radix so decimal and binary values never share an entry)
+def _rawkey(arg):
+    if isinstance(arg, R):
+        return (arg._tag,) + arg._raw
+    if isinstance(arg, C):
+        return ('C',) + _rawkey(arg.rcomp) + _rawkey(arg.icomp)
+    try:
+        hash(arg)
+        return arg
+    except TypeError:
+        return repr(arg)
+
+# rough in-memory size of a cached result
+def _nbytes(ret):
+    if isinstance(ret, R):
+        return 100 + ret._raw.num.bit_length()//8
+    if isinstance(ret, C):
+        return 100 + _nbytes(ret.rcomp) + _nbytes(ret.icomp)
+    if isinstance(ret, tuple):
+        return 100 + sum(_nbytes(i) for i in ret)
+    return 100
+
+# result cached at a higher precision cut down to prec
+def _reprec(ret, prec, trim_on):
+    if isinstance(ret, R):
+        return R(ret, prec=prec, trim_on=trim_on, radix=ret._radix).dtrim()
+    if isinstance(ret, C):
+        return C((_reprec(ret.rcomp, prec, trim_on), _reprec(ret.icomp, prec, trim_on)), prec=prec, trim_on=trim_on)
+    if isinstance(ret, tuple):
+        return tuple(_reprec(i, prec, trim_on) for i in ret)
+    return ret
+
+# cached results are shared -- make them read-only
+# a result that is one of the caller's args (i.e. ib_sqrt(0)) is copied first
+def _freeze(ret, args=()):
+    if isinstance(ret, R) or isinstance(ret, C):
+        if any(ret is i for i in args):
+            ret = type(ret)(ret, **ret.kwargs)
+        return ret.freeze()
+    if isinstance(ret, tuple):
+        return tuple(_freeze(i, args) for i in ret)
+    return ret
+
 # memoize a decorated function's output by input
-# clear all with ibtools.clear_caches()
+# a result cached at a higher precision answers lower precision calls by truncation
+# least recently used results are evicted past maxbytes (per memoizer)
+# clear all with ibtools.clear_caches(), inspect with ibtools.cache_stats()
 class MemoizeIBRCall:
     _instances = list()
+    # default byte budget per memoizer
+    maxbytes = 64 * 2**20
 
     # wipe all caches
+    # returns {memoizer: entries removed}
     @classmethod
     def clearall(cls):
+        removed = dict()
         for i in cls._instances:
-            print('{}: removing {}'.format(repr(i), len(i.tbl)))
-            i.tbl.clear()
+            removed[repr(i)] = i.clear()
+        return removed
 
-    def __init__(self):
-        self.tbl = dict()
+    # counters for all memoizers
+    @classmethod
+    def allstats(cls):
+        return {repr(i): i.stats for i in cls._instances}
+
+    def __init__(self, maxbytes=None):
+        self.tbl = OrderedDict()
+        # cached precisions by (id, trim_on)
+        self.ladder = dict()
+        self.nbytes = 0
+        self.hits = 0
+        self.ladder_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
         self._repr = None
+        if maxbytes is not None:
+            self.maxbytes = maxbytes
         type(self)._instances.append(self)
 
+    def clear(self):
+        with self.lock:
+            cnt = len(self.tbl)
+            self.tbl.clear()
+            self.ladder.clear()
+            self.nbytes = 0
+        return cnt
+
+    # change the byte budget, evicting as needed
+    def set_maxbytes(self, maxbytes):
+        with self.lock:
+            self.maxbytes = maxbytes
+            self._evict()
+
+    @property
+    def stats(self):
+        return {'entries': len(self.tbl), 'bytes': self.nbytes, 'maxbytes': self.maxbytes,
+                'hits': self.hits, 'ladder_hits': self.ladder_hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+    # drop least recently used entries until under budget -- call holding the lock
+    def _evict(self):
+        while self.nbytes > self.maxbytes and self.tbl:
+            (key, (_, size)) = self.tbl.popitem(last=False)
+            self._unlist(key)
+            self.nbytes -= size
+            self.evictions += 1
+
+    # call holding the lock
+    def _store(self, key, ret, size):
+        self.tbl[key] = (ret, size)
+        self.ladder.setdefault((key.id, key.trim_on), set()).add(key.prec)
+        self.nbytes += size
+        self._evict()
+
+    # call holding the lock
+    def _unlist(self, key):
+        precs = self.ladder[(key.id, key.trim_on)]
+        precs.discard(key.prec)
+        if not precs:
+            del self.ladder[(key.id, key.trim_on)]
+
+    # closest cached key at or above key's precision -- call holding the lock
+    def _climb(self, key):
+        precs = self.ladder.get((key.id, key.trim_on), ())
+        above = [i for i in precs if i > key.prec]
+        if not above:
+            return None
+        return key._replace(prec=min(above))
+
     def __call__(self, func):
         self._repr = 'Memoizer for {}'.format(func.__name__)
+        name = func.__name__
         @wraps(func)
         def inner(*args, **kwargs):
             # must call with positional primary arg
@@ -31,20 +151,78 @@ class MemoizeIBRCall:
                     tmp = args[0]
                 else:
                     tmp = R(args[0])
+                (prec, trim_on) = (tmp.prec, tmp.trim_on)
             else:
                 tmp = None
-            skw = R((0, 0)).kwargs if tmp is None else tmp.kwargs
-            key = Memo(repr(tmp)+repr(args[1:])+repr(kwargs), **skw)
-            if key in self.tbl:
-                return self.tbl[key]
-            ret = func(*args, **kwargs)
-            self.tbl[key] = ret
+                ctx = getcontext()
+                (prec, trim_on) = (ctx.prec, ctx.trim_on)
+            rid = (_rawkey(tmp),) + tuple(_rawkey(i) for i in args[1:])
+            if kwargs:
+                rid += tuple((k, _rawkey(v)) for (k, v) in sorted(kwargs.items()))
+            key = Memo(rid, prec, trim_on)
+            with self.lock:
+                if key in self.tbl:
+                    self.tbl.move_to_end(key)
+                    self.hits += 1
+                    if _stats.on:
+                        _stats.memo(name, 'hits')
+                    return self.tbl[key][0]
+                high = self._climb(key)
+                if high is None:
+                    self.misses += 1
+                else:
+                    self.tbl.move_to_end(high)
+                    self.ladder_hits += 1
+                    ret = self.tbl[high][0]
+                if _stats.on:
+                    _stats.memo(name, 'misses' if high is None else 'ladder_hits')
+            if high is not None:
+                return _freeze(_reprec(ret, prec, trim_on))
+            if _stats.on:
+                start = perf_counter()
+                ret = _freeze(func(*args, **kwargs), args)
+                _stats.time(name, perf_counter() - start)
+            else:
+                ret = _freeze(func(*args, **kwargs), args)
+            size = _nbytes(ret)
+            with self.lock:
+                if key not in self.tbl:
+                    self._store(key, ret, size)
             return ret
         return inner
 
     def __repr__(self):
         return self._repr
 
+# shared, read-only IBReal constants by (raw, prec, trim_on, radix)
+# i.e. ib_const((2, 0), **val.kwargs) -- never build these inside series loops
+class IBConstPool:
+    def __init__(self):
+        self.tbl = dict()
+
+    def __call__(self, raw, prec=None, trim_on=None, radix=None):
+        ctx = getcontext()
+        prec = ctx.prec if prec is None else prec
+        trim_on = ctx.trim_on if trim_on is None else trim_on
+        radix = ctx.radix if radix is None else radix
+        key = (raw, prec, trim_on, radix)
+        if key not in self.tbl:
+            self.tbl[key] = R(raw, prec=prec, trim_on=trim_on, radix=radix).freeze()
+        return self.tbl[key]
+
+    # convergence threshold 10**-exp
+    def small(self, exp, prec=None, trim_on=None, radix=None):
+        return self(Ival(1, exp), prec=prec, trim_on=trim_on, radix=radix)
+
+    def clear(self):
+        self.tbl.clear()
+
+# constant pool
+# singleton and callables
+_const_pool = IBConstPool()
+ib_const = _const_pool
+ib_small = _const_pool.small
+
 # factorial generator with parity
 class FactGen:
     def __init__(self, parity='off'):
@@ -83,62 +261,319 @@ class FactGen:
     def __exit__(self, *args, **kwargs):
         self.close()
 
+# fixed-point kernels
+# integers scaled by 10**wp, carrying _GUARD digits past the requested precision
+_GUARD = 10
+
+# log2(10)
+_LOG2_10 = 3.321928094887362
+
+# fixed-point constants by name -- (wp, value) at the highest precision computed so far
+# lower precisions are served by truncation; higher ones recompute with some headroom
+_fx_consts = dict()
+
+# with a constant store configured (see ibstore), values are looked up there before
+# computing and saved there after
+def _fx_const(name, wp, compute):
+    (cwp, val) = _fx_consts.get(name, (-1, 0))
+    if cwp < wp:
+        cwp = max(wp, cwp + cwp//4)
+        store = get_store()
+        found = None if store is None else store.get(name, cwp)
+        if found is None:
+            val = compute(cwp)
+            if store is not None:
+                store.put(name, cwp, val, cwp)
+        else:
+            (cwp, num, off) = found
+            val = num * _pow10(cwp-off) if cwp >= off else num // _pow10(off-cwp)
+        _fx_consts[name] = (cwp, val)
+    return val // _pow10(cwp-wp)
+
+# names of the constants _fx_const knows how to build
+def _fx_named(name, wp):
+    return {'pi': _fx_pi, 'ln2': _fx_ln2, 'ln10': _fx_ln10, 'e': _fx_e}[name](wp)
+
+# IBReal to fixed point at wp digits (truncates toward zero)
+def _fx_from_real(val, wp):
+    (num, off) = val.ival
+    if off <= wp:
+        return num * _pow10(wp-off)
+    tmp = abs(num) // _pow10(off-wp)
+    return -tmp if num < 0 else tmp
+
+# atanh(1/n) for integer n > 1
+def _fx_atanh_inv(n, wp):
+    n2 = n*n
+    pw = _pow10(wp) // n
+    rsum = pw
+    idx = 3
+    while pw:
+        pw //= n2
+        rsum += pw // idx
+        idx += 2
+    if _stats.on:
+        _stats.iters('atanh', (idx-3) // 2)
+    return rsum
+
+# ln2 = 18*atanh(1/26) - 2*atanh(1/4801) + 8*atanh(1/8749)
+def _fx_ln2(wp):
+    def compute(wp):
+        wq = wp + _GUARD
+        tmp = 18*_fx_atanh_inv(26, wq) - 2*_fx_atanh_inv(4801, wq) + 8*_fx_atanh_inv(8749, wq)
+        return tmp // _pow10(_GUARD)
+    return _fx_const('ln2', wp, compute)
+
+# ln10 = 3*ln2 + 2*atanh(1/9)
+def _fx_ln10(wp):
+    def compute(wp):
+        wq = wp + _GUARD
+        tmp = 3*_fx_ln2(wq) + 2*_fx_atanh_inv(9, wq)
+        return tmp // _pow10(_GUARD)
+    return _fx_const('ln10', wp, compute)
+
+# e = sum of 1/k!
+def _fx_e(wp):
+    def compute(wp):
+        wq = wp + _GUARD
+        term = rsum = _pow10(wq)
+        idx = 1
+        while term:
+            term //= idx
+            rsum += term
+            idx += 1
+        if _stats.on:
+            _stats.iters('e', idx-1)
+        return rsum // _pow10(_GUARD)
+    return _fx_const('e', wp, compute)
+
+# Chudnovsky series terms [a, b) by binary splitting
+# returns integers (P, Q, T)
+def _pi_bsplit(a, b):
+    if b - a == 1:
+        if a == 0:
+            p = q = 1
+        else:
+            p = (6*a-5) * (2*a-1) * (6*a-1)
+            # 640320**3 / 24
+            q = a*a*a * 10939058860032000
+        t = p * (13591409 + 545140134*a)
+        return (p, q, -t if a % 2 else t)
+    mid = (a + b) // 2
+    (pam, qam, tam) = _pi_bsplit(a, mid)
+    (pmb, qmb, tmb) = _pi_bsplit(mid, b)
+    return (pam*pmb, qam*qmb, qmb*tam + pam*tmb)
+
+# Chudnovsky sums so far -- [terms, P, Q, T]
+# more precision extends the split from where it stopped
+_pi_state = [1, 1, 1, 13591409]
+
+# forget all fixed-point constant state -- the next call starts from scratch
+# (or from the constant store)
+def _fx_clear():
+    _fx_consts.clear()
+    _pi_state[:] = (1, 1, 1, 13591409)
+
+# pi = 426880*sqrt(10005)*Q/T
+# each series term adds a little over 14 digits
+def _fx_pi(wp):
+    def compute(wp):
+        wq = wp + _GUARD
+        (cnt, p, q, t) = _pi_state
+        if cnt < wq//14 + 2:
+            if _stats.on:
+                _stats.iters('pi', wq//14 + 2 - cnt)
+            (pmb, qmb, tmb) = _pi_bsplit(cnt, wq//14 + 2)
+            (cnt, p, q, t) = (wq//14 + 2, p*pmb, q*qmb, qmb*t + p*tmb)
+            _pi_state[:] = (cnt, p, q, t)
+        one = _pow10(wq)
+        tmp = 426880 * isqrt(10005 * one * one) * q // t
+        return tmp // _pow10(_GUARD)
+    return _fx_const('pi', wp, compute)
+
+# (sin(r), cos(r)) for abs(r) <= pi/4 by halving, series and doubling
+def _fx_sincos_reduced(r, wp, halvings):
+    one = _pow10(wp)
+    neg = r < 0
+    r = abs(r) >> halvings
+    r2 = r * r // one
+    sterm = ssum = r
+    cterm = csum = one
+    idx = 1
+    while sterm or cterm:
+        # next terms from the previous ones, alternating in sign
+        sterm = sterm * r2 // (one * (2*idx) * (2*idx+1))
+        cterm = cterm * r2 // (one * (2*idx-1) * (2*idx))
+        if idx % 2:
+            ssum -= sterm
+            csum -= cterm
+        else:
+            ssum += sterm
+            csum += cterm
+        idx += 1
+    if _stats.on:
+        _stats.iters('sincos', idx-1)
+    for _ in range(halvings):
+        (ssum, csum) = (2 * ssum * csum // one, (csum - ssum) * (csum + ssum) // one)
+    return (-ssum if neg else ssum, csum)
+
+# num * 10**-off * 2**shift in fixed point
+def _fx_scale(num, off, shift, wp):
+    numer = num * _pow10(max(wp-off, 0)) << max(shift, 0)
+    denom = _pow10(max(off-wp, 0)) << max(-shift, 0)
+    return numer // denom
+
+# log(y) = 2*atanh((y-1)/(y+1)) for y near one
+def _fx_log_atanh(y, wp):
+    one = _pow10(wp)
+    z = (y - one) * one // (y + one)
+    neg = z < 0
+    term = rsum = abs(z)
+    z2 = term * term // one
+    idx = 3
+    while term:
+        term = term * z2 // one
+        rsum += term // idx
+        idx += 2
+    if _stats.on:
+        _stats.iters('log_atanh', (idx-3) // 2)
+    return -2*rsum if neg else 2*rsum
+
+# log(y) = pi/(2*agm(1, 4/s)) - m*log(2) with s = y * 2**m > 10**(wp/2)
+# 4/s is tiny, so the mean runs with wp/2 extra digits
+def _fx_log_agm(y, wp):
+    m = wp * 5 // 3 + 1
+    wq = wp + wp//2 + _GUARD
+    one = _pow10(wq)
+    a = one
+    b = 4 * one * _pow10(wp) // (y << m)
+    steps = 0
+    while abs(a - b) > 1:
+        (a, b) = ((a + b) // 2, isqrt(a * b))
+        steps += 1
+    if _stats.on:
+        _stats.iters('log_agm', steps)
+    tmp = _fx_pi(wq) * one // (2 * a) - m * _fx_ln2(wq)
+    return tmp // _pow10(wq-wp)
+
+# arctan(t) for abs(t) <= 1 by half-angle reduction and series
+# arctan(t) = 2*arctan(t/(1+sqrt(1+t*t)))
+def _fx_atan(t, wp, halvings):
+    one = _pow10(wp)
+    neg = t < 0
+    t = abs(t)
+    for _ in range(halvings):
+        t = t * one // (one + isqrt(one * one + t * t))
+    t2 = t * t // one
+    term = rsum = t
+    idx = 1
+    while term:
+        # next term from the previous one, alternating in sign
+        term = term * t2 // one
+        if idx % 2:
+            rsum -= term // (2*idx+1)
+        else:
+            rsum += term // (2*idx+1)
+        idx += 1
+    if _stats.on:
+        _stats.iters('atan', idx-1)
+    rsum <<= halvings
+    return -rsum if neg else rsum
+
+# angle of the point (x, y) in (-pi, pi] -- not both zero
+def _fx_atan2(y, x, wp):
+    one = _pow10(wp)
+    halvings = isqrt(wp)//4
+    mypi = _fx_pi(wp)
+    if abs(y) <= abs(x):
+        th = _fx_atan(_fx_div(y * one, x), wp, halvings)
+        if x < 0:
+            th += mypi if y >= 0 else -mypi
+        return th
+    halfpi = mypi // 2
+    return (halfpi if y > 0 else -halfpi) - _fx_atan(_fx_div(x * one, y), wp, halvings)
+
+# integer division truncated toward zero
+def _fx_div(num, den):
+    tmp = abs(num) // abs(den)
+    return -tmp if (num < 0) != (den < 0) else tmp
+
+# exp(r) for 0 <= r < ln10 by halving, series and squaring
+def _fx_exp_reduced(r, wp, halvings):
+    one = _pow10(wp)
+    r >>= halvings
+    term = one
+    rsum = one
+    idx = 1
+    while term:
+        term = term * r // (one * idx)
+        rsum += term
+        idx += 1
+    if _stats.on:
+        _stats.iters('exp', idx-1)
+    for _ in range(halvings):
+        rsum = rsum * rsum // one
+    return rsum
+
+# (sin(x), cos(x)) for any x
+def _fx_sincos(x, wp, halvings):
+    # x = quad*pi/2 + r, abs(r) <= pi/4
+    halfpi = _fx_pi(wp) // 2
+    quad = (2*x + halfpi) // (2*halfpi)
+    (sn, cs) = _fx_sincos_reduced(x - quad*halfpi, wp, halvings)
+    # quadrant symmetry
+    return ((sn, cs), (cs, -sn), (-sn, -cs), (-cs, sn))[quad % 4]
+
+# floor of the nth root of a non-negative integer
+# Newton from just above a float estimate of the leading bits
+def _iroot(x, n):
+    if n == 2:
+        return isqrt(x)
+    if x < 2:
+        return x
+    shift = max(x.bit_length() - 100, 0) // n * n
+    y = (int((x >> shift) ** (1/n) * (1 + 2**-40)) + 1) << (shift // n)
+    steps = 1
+    while True:
+        tmp = ((n - 1) * y + x // y**(n - 1)) // n
+        if tmp >= y:
+            if _stats.on:
+                _stats.iters('root', steps)
+            return y
+        y = tmp
+        steps += 1
+
+# nth root of num * 10**-off (num >= 0) in fixed point at wp
+def _fx_root(num, off, n, wp):
+    exp = n*wp - off
+    if exp >= 0:
+        return _iroot(num * _pow10(exp), n)
+    return _iroot(num // _pow10(-exp), n)
+
 class IBArcTan:
-    #!! Very slow to converge near one
-    # need a good algorithm for near one
+    # arctan(tan) == atan2(tan, 1)
     def __call__(self, tan):
         if not isinstance(tan, R):
             tan = R(tan)
-        sgn = ib_sgn(tan)
-        if tan < 0:
-            tan = abs(tan)
-        if abs(tan) < 1:
-            return sgn*self._arctan_lt1(tan)
-        else:
-            return sgn*self._arctan_gt1(tan)
-    
-    # for abs(tan) greater than or equal to one
-    def _arctan_gt1(self, tan):
-        # for tan >= 1 or <= -1
-        neg1 = R((-1, 0), **tan.kwargs)
-        one = R((1, 0), **tan.kwargs)
-        two = R((2, 0), **tan.kwargs)
-        ten = R((10, 0), **tan.kwargs)
-        idx = R((0, 0), **tan.kwargs)
-        rsum = R((0, 0), **tan.kwargs)
-        overshoot = one
-        small = one / ten**(tan.prec+overshoot)
-        halfpi = ib_pi(**tan.kwargs) / two
-        while True:
-            a = neg1**idx
-            b = one / (two*idx+one) / tan**(two*idx+one)
-            term = a * b
-            rsum += term
-            if abs(term) < small:
-                break
-            idx += one
-        return ib_sgn(tan)*halfpi-rsum
-        
-    # for abs(tan) less than one    
-    def _arctan_lt1(self, tan):
-        # for -1 <= tan <= 1
-        neg1 = R((-1, 0), **tan.kwargs)
-        one = R((1, 0), **tan.kwargs)
-        two = R((2, 0), **tan.kwargs)
-        ten = R((10, 0), **tan.kwargs)
-        idx = R((0, 0), **tan.kwargs)
-        rsum = R((0, 0), **tan.kwargs)
-        overshoot = one
-        small = one / ten**(tan.prec+overshoot)
-        while True:
-            a = neg1**idx
-            b = tan**(two*idx+one) / (two*idx+one)
-            term = a * b
-            rsum += term
-            if abs(term) < small:
-                break
-            idx += one
-        return rsum
+        return self.atan2(tan, ib_const((1, 0), **tan.kwargs))
+
+    # angle of the point (x, y) in (-pi, pi]
+    def atan2(self, y, x):
+        (ynum, xnum) = (y.ival.num, x.ival.num)
+        # on an axis -- 0, pi or +-pi/2 directly
+        if ynum == 0:
+            if xnum >= 0:
+                return R((0, 0), **y.kwargs)
+            return ib_pi(**y.kwargs)
+        if xnum == 0:
+            return ib_pi(ib_const((5 if ynum > 0 else -5, 1), **y.kwargs))
+        # the angle only depends on y/x -- scale both by the larger magnitude
+        (ymag, xmag) = (y.ilength - y.ival.off, x.ilength - x.ival.off)
+        mag = max(ymag, xmag)
+        # a tiny y/x gives a tiny angle -- carry its leading zeros as extra digits
+        wp = y.prec + _GUARD + max(xmag - ymag, 0)
+        th = _fx_atan2(_fx_from_real(y, wp-mag), _fx_from_real(x, wp-mag), wp)
+        return R(Ival(th, wp), **y.kwargs).dtrim()
 
 # arctangent
 # singleton and memoized callable
@@ -148,6 +583,17 @@ ibarctanmemo = MemoizeIBRCall()
 def ib_arctan(tan):
     return _arctan_sing(tan)
 
+# two-argument arctangent -- angle of the point (x, y) in (-pi, pi]
+# precision is taken from y
+ibatan2memo = MemoizeIBRCall()
+@ibatan2memo
+def ib_atan2(y, x):
+    if not isinstance(y, R):
+        y = R(y)
+    if not isinstance(x, R):
+        x = R(x, **y.kwargs)
+    return _arctan_sing.atan2(y, x)
+
 # only base e for now
 class IBExp:
     def __call__(self, val):
@@ -157,39 +603,33 @@ class IBExp:
              if not isinstance(val, R):
                  val = R(val)
              return self._exp_real(val)
-    
+
+    # reduce val = k*ln10 + r (0 <= r < ln10), halve r, sum the series
+    # by term recurrence, square back up and shift the offset by k
     def _exp_real(self, val):
-        one = R((1, 0), **val.kwargs)
-        ten = R((10, 0), **val.kwargs)
-        idx = R((0, 0), **val.kwargs)
-        rsum = R((0, 0), **val.kwargs)
-        overshoot = one
-        small = one / ten**(val.prec+overshoot)
-        with FactGen() as fac:
-            while True:
-                term = val**idx / next(fac)
-                rsum += term
-                if abs(term) < small:
-                    break
-                idx += one 
-        return rsum
-    
+        if val.ival.num == _pow10(val.ival.off):
+            # e itself -- a cached (and possibly stored) constant
+            wp = val.prec + _GUARD
+            return R(Ival(_fx_e(wp), wp), **val.kwargs).dtrim()
+        # digits in the integer part of val are lost to the reduction
+        ndig = max(val.ilength - val.ival.off, 0)
+        halvings = isqrt(val.prec + ndig) + 2
+        wp = val.prec + ndig + halvings//3 + _GUARD
+        x = _fx_from_real(val, wp)
+        ln10 = _fx_ln10(wp)
+        k = x // ln10
+        y = _fx_exp_reduced(x - k*ln10, wp, halvings)
+        return R(Ival(y, wp-k), **val.kwargs).dtrim()
+
+    # exp(a+bi) = exp(a) * (cos(b) + i*sin(b)) -- sincos reduces b by pi/2
     def _exp_comp(self, val):
-        one = R((1, 0), **val.kwargs)
-        ten = R((10, 0), **val.kwargs)
-        idx = R((0, 0), **val.kwargs)
-        rsum = C((0, 0), **val.kwargs)
-        overshoot = one
-        small = one / ten**(val.prec+overshoot)
-        with FactGen() as fac:
-            while True:
-                term = val**idx / next(fac)
-                rsum += term
-                # right way to do this??
-                if abs(term.rcomp) < small and abs(term.icomp) < small:
-                    break
-                idx += one 
-        return rsum
+        # guard digits so the two products round once, at the end
+        wp = val.prec + _GUARD
+        mag = self._exp_real(R(val.rcomp, prec=wp, radix=val.radix))
+        (sn, cs) = ib_sincos(R(val.icomp, prec=wp, radix=val.radix))
+        rcmp = R(mag*cs, **val.rcomp.kwargs).dtrim()
+        icmp = R(mag*sn, **val.icomp.kwargs).dtrim()
+        return C((rcmp, icmp), **val.kwargs)
 
 # exponential base e
 # singleton and memoized callable
@@ -201,74 +641,51 @@ def ib_exp(val):
 
 # only base e for now
 class IBLog:
-    def __init__(self):
-        self._log2 = None
+    # working precision above which AGM beats the atanh series
+    agm_prec = 150
 
     def __call__(self, val):
         if isinstance(val, C):
             return self._log_comp(val)
         if not isinstance(val, R):
             val = R(val)
-        zero = R((0, 0), **val.kwargs)
+        zero = ib_const((0, 0), **val.kwargs)
         if val < zero: # need to use complex
             val = C(val)
             return self._log_comp(val)
-        zero = R((0, 0), **val.kwargs)
-        two = R((2, 0), **val.kwargs)
-        cnt = R((0, 0), **val.kwargs)
-        one = R((1, 0), **val.kwargs)
-        if self._log2 is None or self._log2.prec < val.prec:
-            self._log2 = self._log_real(two)
-        # nudge value towards one by successively dividing by two
-        if val > one:
-            while True:
-                if val <= two:
-                    break
-                val /= two
-                cnt += one
-            return self._log_real(val) + (cnt * self._log2)
-        # nudge value towards one by successively multiplying by two
-        else:
-            while True:
-                if val >= one:
-                    break
-                val *= two
-                cnt += one
-            return self._log_real(val) - (cnt * self._log2)
+        if val == zero:
+            raise ValueError('Logarithm of zero')
+        return self._log_real(val)
 
     def _log_comp(self, val):
-        zero = R((0, 0), **val.kwargs)
-        two = R((2, 0), **val.kwargs)
-        mypi = ib_pi(**val.kwargs)
-        my2pi = two * mypi
         lr = ib_log(val.length)
-        cm = C((0, val.theta), **val.kwargs) + lr
-        # get principal value
-        while abs(cm.icomp) > mypi:
-            cm.icomp -= ib_sgn(cm.icomp)*my2pi
-        return cm
+        return C((0, val.theta), **val.kwargs) + lr
 
+    # val = y * 2**n with y near one, so log(val) = log(y) + n*log(2)
     def _log_real(self, val):
-        # can be SLOW
-        neg1 = R((-1, 0), **val.kwargs)
-        one = R((1, 0), **val.kwargs)
-        ten = R((10, 0), **val.kwargs)
-        idx = R((1, 0), **val.kwargs) 
-        rsum = R((0, 0), **val.kwargs)
-        overshoot = one
-        small = one / ten**(val.prec+overshoot)
-        neg = ib_sgn(one-val)
-        if val > one:
-            # log(1/x) = -log(x)
-            val = one / val
-        val = one - val
-        while True:
-            term = neg1 * val**idx / idx
-            rsum += term
-            if abs(term) < small:
-                break
-            idx += one 
-        return neg * rsum
+        (num, off) = val.ival
+        one = _pow10(val.prec + _GUARD)
+        # power of two straight from the bit length, then nudge y into [1/sqrt2, sqrt2]
+        n = num.bit_length() - round(off * _LOG2_10)
+        y = _fx_scale(num, off, -n, val.prec + _GUARD)
+        while y * y > 2 * one * one:
+            n += 1
+            y = _fx_scale(num, off, -n, val.prec + _GUARD)
+        while 2 * y * y < one * one:
+            n -= 1
+            y = _fx_scale(num, off, -n, val.prec + _GUARD)
+        if n == 0 and y == one:
+            return R((0, 0), **val.kwargs)
+        # near one, log(y) ~ y-1 -- carry the leading zeros of y-1 as extra digits
+        lost = 0 if n else _GUARD + val.prec - abs(y - one).bit_length() * 3 // 10
+        wp = val.prec + _GUARD + max(lost, 0)
+        y = _fx_scale(num, off, -n, wp)
+        if wp > self.agm_prec:
+            rsum = _fx_log_agm(y, wp)
+        else:
+            rsum = _fx_log_atanh(y, wp)
+        rsum += n * _fx_ln2(wp)
+        return R(Ival(rsum, wp), **val.kwargs).dtrim()
 
 # log base e
 # singleton and memoized callable
@@ -283,9 +700,7 @@ def ib_log(val):
 # (i.e. ib_logs(C('1+2i'))(3) for third branch)
 def ib_logs(val):
     val = C(val)
-    one = R((1, 0), **val.kwargs)
-    two = R((2, 0), **val.kwargs)
-    my2pi = ib_pi(two, **val.kwargs)
+    my2pi = ib_pi(ib_const((2, 0), **val.kwargs))
     princ_log = ib_log(val)
     @wraps(ib_logs)
     def inner(branch):
@@ -304,57 +719,91 @@ def ib_i(val=None, **kwargs):
     return val * C((0, 1), **val.kwargs) 
 
 # pi times val
+# pi itself is computed once per precision and cached
 def ib_pi(val=None, **kwargs):
     if val is None:
-        val = R((1, 0), **kwargs)
+        val = ib_const((1, 0), **kwargs)
     if not isinstance(val, R) and not isinstance(val, C):
         val = R(val, **kwargs)
-    one = R((1, 0), **val.kwargs)
-    two = R((2, 0), **val.kwargs)
-    four = R((4, 0), **val.kwargs)
-    five = R((5, 0), **val.kwargs)
-    six = R((6, 0), **val.kwargs)
-    eight = R((8, 0), **val.kwargs)
-    ten = R((10, 0), **val.kwargs)
-    sixteen = R((16, 0), **val.kwargs)
-    idx = R((0, 0), **val.kwargs)
-    rsum = R((0, 0), **val.kwargs)
-    overshoot = one
-    small = one / ten**(one.prec+overshoot)
-    while True:
-        a = one / sixteen**idx
-        b = four / (eight*idx+one)
-        c = two / (eight*idx+four)
-        d = one / (eight*idx+five)
-        e = one / (eight*idx+six)
-        term = a * (b - c - d - e)
-        rsum += term
-        if abs(term) < small:
-            break
-        idx += one
-    return val * rsum
+    mypi = R(Ival(_fx_pi(val.prec), val.prec), **val.kwargs)
+    return val * mypi
 
 # regular square root
 def ib_sqrt(val):
     if not isinstance(val, R) and not isinstance(val, C):
         val = R(val)
-    two = R((2, 0), **val.kwargs)
-    return ib_root(val, two)
+    return ib_root(val, ib_const((2, 0), **val.kwargs))
+
+# integer roots of reals and complex square roots straight from integer roots
+# anything else through log/exp -- always the principal branch
+class IBRoot:
+    def __call__(self, val, root):
+        if not isinstance(val, R) and not isinstance(val, C):
+            val = R(val)
+        if not isinstance(root, R) and not isinstance(root, C):
+            root = R(root)
+        if val == ib_const((0, 0), **val.kwargs):
+            return val
+        if isinstance(root, R) and root.isint and int(root) > 0:
+            n = int(root)
+            if isinstance(val, R) and val.ival.num > 0:
+                return self._root_real(val, n)
+            if isinstance(val, R) and n > 2:
+                return self._root_neg(val, n)
+            if n == 2:
+                return self._sqrt_comp(val if isinstance(val, C) else C(val, **val.kwargs))
+        lv = ib_log(val)
+        return ib_exp(lv/root)
+
+    # val**(1/n) for val > 0
+    def _root_real(self, val, n):
+        (num, off) = val.ival
+        # enough places after the point for prec + _GUARD significant digits
+        wp = val.prec + _GUARD - (_ndigits(num) - off) // n
+        tmp = _fx_root(num, off, n, wp)
+        return R(Ival(tmp, wp), **val.kwargs).dtrim()
+
+    # principal val**(1/n) for val < 0 -- abs(val)**(1/n) * cis(pi/n)
+    def _root_neg(self, val, n):
+        # guard digits so the product rounds once, at the end
+        kwargs = dict(val.kwargs, prec=val.prec + _GUARD)
+        mag = self._root_real(R(-val, **kwargs), n)
+        cis = ib_cis_table(2*n, **kwargs)[1]
+        rcmp = R(mag*cis.rcomp, **val.kwargs).dtrim()
+        icmp = R(mag*cis.icomp, **val.kwargs).dtrim()
+        return C((rcmp, icmp), **val.kwargs)
+
+    # principal sqrt(a+bi) from r = abs(a+bi) and t = sqrt((r+abs(a))/2)
+    # a >= 0: t + bi/(2t), a < 0: abs(b)/(2t) + sign(b)*ti -- no cancellation either way
+    # b/(2t) comes from b's exact mantissa, so it keeps its digits however small b is
+    def _sqrt_comp(self, val):
+        (rnum, inum, off) = val._ipair()
+        mag = _ndigits(max(abs(rnum), abs(inum))) - off
+        wp = val.prec + _GUARD + max(-mag, 0)
+        (a, b) = (_fx_from_real(val.rcomp, wp), _fx_from_real(val.icomp, wp))
+        one = _pow10(wp)
+        r = isqrt(a*a + b*b)
+        t = isqrt((r + abs(a)) * one // 2)
+        # u = inum*10**-off / (2*t*10**-wp) with prec + _GUARD digits of its own
+        exp = val.prec + _GUARD + _ndigits(2*t) - _ndigits(inum)
+        tmp = abs(inum) * _pow10(max(exp, 0)) // (2 * t * _pow10(max(-exp, 0)))
+        u = Ival(-tmp if inum < 0 else tmp, exp + off - wp)
+        if a >= 0:
+            (rcmp, icmp) = (Ival(t, wp), u)
+        else:
+            (rcmp, icmp) = (Ival(abs(u.num), u.off), Ival(-t if inum < 0 else t, wp))
+        rcmp = R(rcmp, **val.rcomp.kwargs).dtrim()
+        icmp = R(icmp, **val.icomp.kwargs).dtrim()
+        return C((rcmp, icmp), **val.kwargs)
 
 # single, arbitrary root
 # uses principal branch of log for a single root
+# singleton and memoized callable
+_ibroot_sing = IBRoot()
 ibrootmemo = MemoizeIBRCall()
 @ibrootmemo
 def ib_root(val, root):
-    if not isinstance(val, R) and not isinstance(val, C):
-        val = R(val)
-    if not isinstance(root, R) and not isinstance(root, C):
-        root = R(root)
-    zero = R((0, 0), **val.kwargs)
-    if val == zero:
-        return val
-    lv = ib_log(val)
-    return ib_exp(lv/root)
+    return _ibroot_sing(val, root)
 
 # multiple arbitrary roots
 # returns a closure to allow access to any root, specified by corresponding 
@@ -364,11 +813,10 @@ def ib_roots(val, root):
         val = R(val)
     if not isinstance(root, R) and not isinstance(root, C):
         root = R(root)
-    zero = R((0, 0), **val.kwargs)
-    if val == zero:
+    if val == ib_const((0, 0), **val.kwargs):
         @wraps(ib_roots)
         def inner(num):
-            return zero
+            return R((0, 0), **val.kwargs)
         return inner
     lv = ib_logs(val)
     @wraps(ib_roots)
@@ -379,57 +827,92 @@ def ib_roots(val, root):
         return ib_exp(lv(branch)/root)
     return inner
 
-# sine
+# sine and cosine together
 # real arguments only
-ibsinmemo = MemoizeIBRCall()
-@ibsinmemo
-def ib_sin(theta):
+ibsincosmemo = MemoizeIBRCall()
+@ibsincosmemo
+def ib_sincos(theta):
     if not isinstance(theta, R):
         theta = R(theta)
-    neg1 = R((-1, 0), **theta.kwargs)
-    one = R((1, 0), **theta.kwargs)
-    two = R((2, 0), **theta.kwargs)
-    ten = R((10, 0), **theta.kwargs)
-    idx = R((1, 0), **theta.kwargs)
-    rsum = R((0, 0), **theta.kwargs)
-    seq = R((0, 0), **theta.kwargs)
-    overshoot = one
-    small = one / ten**(theta.prec+overshoot)
-    with FactGen('odd') as fac:
-        while True:
-            term = neg1**seq * theta**idx / next(fac)
-            rsum += term
-            if abs(term) < small:
-                break
-            idx += two
-            seq += one
-    return rsum
+    # digits in the integer part of theta are lost to the reduction
+    # a tiny theta gives a tiny sine -- carry its leading zeros as extra digits
+    ndig = max(theta.ilength - theta.ival.off, 0)
+    nlead = max(theta.ival.off - theta.ilength, 0)
+    wp = theta.prec + ndig + nlead + _GUARD
+    halvings = isqrt(wp)//2
+    wp += halvings//3
+    (sn, cs) = _fx_sincos(_fx_from_real(theta, wp), wp, halvings)
+    return (R(Ival(sn, wp), **theta.kwargs).dtrim(), R(Ival(cs, wp), **theta.kwargs).dtrim())
+
+# sine
+# real arguments only
+def ib_sin(theta):
+    return ib_sincos(theta)[0]
 
 # cosine
 # real arguments only
-ibcosmemo = MemoizeIBRCall()
-@ibcosmemo
 def ib_cos(theta):
+    return ib_sincos(theta)[1]
+
+# cos(theta) + i*sin(theta)
+# real arguments only
+def ib_cis(theta):
     if not isinstance(theta, R):
         theta = R(theta)
-    neg1 = R((-1, 0), **theta.kwargs)
-    one = R((1, 0), **theta.kwargs)
-    two = R((2, 0), **theta.kwargs)
-    ten = R((10, 0), **theta.kwargs)
-    rsum = R((0, 0), **theta.kwargs)
-    idx = R((0, 0), **theta.kwargs)
-    seq = R((0, 0), **theta.kwargs)
-    overshoot = one
-    small = one / ten**(theta.prec+overshoot)
-    with FactGen('even') as fac:
-        while True:
-            term = neg1**seq * theta**idx / next(fac)
-            rsum += term
-            if abs(term) < small:
-                break
-            idx += two
-            seq += one
-    return rsum
+    (sn, cs) = ib_sincos(theta)
+    return C((cs, sn), **theta.kwargs)
+
+# tables of cis(2*pi*k/n), k = 0..n-1 (roots of unity, DFT twiddles)
+# entries are frozen and shared -- the conjugate table is tbl[-k % n]
+class IBCisTable:
+    def __init__(self):
+        self.tbl = dict()
+
+    def __call__(self, n, prec=None, trim_on=None, radix=None):
+        if not isinstance(n, int) or n <= 0:
+            raise TypeError('Only positive integers allowed')
+        ctx = getcontext()
+        prec = ctx.prec if prec is None else prec
+        trim_on = ctx.trim_on if trim_on is None else trim_on
+        radix = ctx.radix if radix is None else radix
+        key = (n, prec, trim_on, radix)
+        if key not in self.tbl:
+            self.tbl[key] = self._build(n, prec, trim_on, radix)
+        return self.tbl[key]
+
+    # one kernel call per point up to the first symmetry, the rest by reflection/rotation
+    def _build(self, n, prec, trim_on, radix):
+        wp = prec + _GUARD
+        halvings = isqrt(wp)//2
+        wp += halvings//3
+        (one, twopi) = (_pow10(wp), 2*_fx_pi(wp))
+        pts = [None] * n
+        if n % 4:
+            # cis(-x) = conj(cis(x))
+            for k in range(n//2 + 1):
+                (sn, cs) = _fx_sincos(twopi*k // n, wp, halvings) if k else (0, one)
+                (pts[k], pts[-k]) = ((cs, sn), (cs, -sn))
+        else:
+            # first quadrant from its first octant, then rotate by i
+            qtr = n // 4
+            for k in range(qtr//2 + 1):
+                (sn, cs) = _fx_sincos(twopi*k // n, wp, halvings) if k else (0, one)
+                pts[k] = (cs, sn)
+                if 0 < k < qtr-k:
+                    pts[qtr-k] = (sn, cs)
+            for k in range(qtr, n):
+                (cs, sn) = pts[k-qtr]
+                pts[k] = (-sn, cs)
+        kwargs = {'prec':prec, 'trim_on':trim_on, 'radix':radix}
+        return tuple(C((R(Ival(cs, wp), **kwargs).dtrim(), R(Ival(sn, wp), **kwargs).dtrim()), **kwargs).freeze()
+                     for (cs, sn) in pts)
+
+    def clear(self):
+        self.tbl.clear()
+
+# cis table cache
+# singleton and callable
+ib_cis_table = IBCisTable()
 
 # return sign of arg
 # (needs to be able to handle python ints too)
@@ -439,5 +922,7 @@ def ib_sgn(num=1):
     return type(num)(1)
 
 # here to prevent circular import
-from .ibreal import Ival, IBReal as R
+from .ibreal import Ival, IBReal as R, _ndigits, _pow10
 from .ibcomp import IBComp as C
+from .ibcontext import getcontext
+from .ibstore import get_store
@@ -1,6 +1,7 @@
 from collections import namedtuple
-from math import log
-from os import environ
+from functools import lru_cache
+from .ibcontext import getcontext, ROUND_TRUNC, ROUND_HALF_EVEN, _ROUNDINGS
+from .ibstats import ib_stats as _stats
 
 # the internal integer pair representing a real by (number, offset)
 # where number is an integer representing all the digits in a real
@@ -8,6 +9,73 @@ from os import environ
 # point should be i.e (12345, 2) represents 123.45
 Ival = namedtuple('Ival', 'num off')
 
+# cached powers of ten
+# small exponents are kept outright; large ones are built by squaring a cached
+# half power, so neighbouring large exponents share all but the last step
+_POW10_TIER = 1024
+
+@lru_cache(maxsize=4096)
+def _pow10_small(k):
+    return 10**k
+
+@lru_cache(maxsize=256)
+def _pow10_large(k):
+    half = _pow10(k >> 1)
+    return half * half * 10 if k & 1 else half * half
+
+def _pow10(k):
+    return _pow10_small(k) if k <= _POW10_TIER else _pow10_large(k)
+
+# 2**k // d to within a few units (d > 0) by Newton's method
+# x' = x + x*(2**k - d*x) / 2**k, starting from a half-precision x built the same way
+def _rinv(d, k):
+    nb = d.bit_length()
+    q = k - nb
+    if q <= 256:
+        return (1 << k) // d
+    h = q//2 + 32
+    # leading bits of d are plenty for the half-precision start
+    s = max(nb - (h + 32), 0)
+    dt = d >> s
+    xh = _rinv(dt, dt.bit_length() + h)
+    # x0 = xh << (q-h); e = 2**k - d*x0
+    e = (1 << k) - ((d * xh) << (q - h))
+    t = max(abs(e).bit_length() - (h + 64), 0)
+    return (xh << (q - h)) + ((xh * (e >> t)) >> (k - (q - h) - t))
+
+# (x, k) with x ~ 2**k * 10**nd / den, nd the digit count of den
+# cached, so repeated division by the same value costs one multiply and a shift
+@lru_cache(maxsize=32)
+def _recip(den, keep):
+    k = den.bit_length() + keep * 3322 // 1000 + 64
+    return (_rinv(den, k) * _pow10(_ndigits(den)), k)
+
+# decimal digit count of an integer from its bit length
+# the estimate is exact or a little short -- settled against cached powers of ten
+def _ndigits(num):
+    num = abs(num)
+    if num == 0:
+        return 1
+    cnt = (num.bit_length() - 1) * 30102999566 // 10**11 + 1
+    while num >= _pow10(cnt):
+        cnt += 1
+    return cnt
+
+# decimal exponent range (lo, hi) of num * 10**-off from the bit length alone:
+# 10**lo <= abs(value) < 10**hi, with hi - lo at most 2 (num != 0)
+def _mag(num, off):
+    bits = abs(num).bit_length()
+    return ((bits - 1) * 30102999566 // 10**11 - off, bits * 30103 // 100000 + 1 - off)
+
+# drop low-order digits of a raw (num, off) pair so that num keeps
+# keep digits -- used for untrimmed intermediates
+def _chop(num, off, keep):
+    drop = _ndigits(num) - keep
+    if drop <= 0:
+        return (num, off)
+    tmp = abs(num) // _pow10(drop)
+    return (-tmp if num < 0 else tmp, off-drop)
+
 # arbitrary-precision real number
 class IBReal:
     """
@@ -15,7 +83,7 @@ class IBReal:
     All math operations are available in in-place mode (i.e. +=).
 
     Usage:
-    realnum = IBReal(raw, prec=None, trim_on=True, rep=None)
+    realnum = IBReal(raw, prec=None, trim_on=None, rep=None, radix=None)
 
     raw: IBReal object, number, Ival object, ascii repr of a real number, or tuple (integer, offset) -- where integer 
          is the integer after multiplying the real number by 10^offset. If using an IBReal instance, the precision
@@ -27,18 +95,36 @@ class IBReal:
 
     rep: any special name for this number
 
-    $ export IBR_DEF_PREC=450 :: set environment var to pick up global precision
+    radix: 10 for decimal offsets, 2 for the binary-exponent backend (an IBBinReal, see ibbinary)
+
+    prec, trim_on and radix default to the current ibcontext, which also supplies the trim rounding mode
+    (ROUND_TRUNC or ROUND_HALF_EVEN).
+
+    $ export IBR_DEF_PREC=450 :: set environment var to pick up global precision (read once, at import)
     """
-    def __init__(self, raw, prec=None, trim_on=True, rep=None):
-        if prec is not None:
-            self.prec = prec
-        elif 'IBR_DEF_PREC' in environ:
-            # precision from environment
-            self.prec = int(environ['IBR_DEF_PREC'])
-        else:
-            # default without environment var
-            self.prec = 50 
-        self.trim_on = trim_on
+    # frozen instances never change value -- in-place ops and trim hand back new objects
+    _frozen = False
+    # divisor length (and precision) from which division multiplies by a cached Newton reciprocal
+    newton_prec = 8000
+    # internal radix and ibcodec record tag
+    _radix = 10
+    _tag = b'R'
+
+    # IBReal itself picks the backend from radix (or the context)
+    def __new__(cls, raw=None, prec=None, trim_on=None, rep=None, radix=None):
+        if cls is IBReal:
+            radix = getcontext().radix if radix is None else radix
+            if radix == 2:
+                return object.__new__(IBBinReal)
+            if radix != 10:
+                raise ValueError('Only radix 10 or 2 allowed')
+        return object.__new__(cls)
+
+    def __init__(self, raw, prec=None, trim_on=None, rep=None, radix=None):
+        ctx = getcontext()
+        self.prec = ctx.prec if prec is None else prec
+        self.trim_on = ctx.trim_on if trim_on is None else trim_on
+        self.rounding = ctx.rounding
         self.rep = rep
         try:
             # Ival instance
@@ -62,35 +148,81 @@ class IBReal:
             raise ValueError('Failed to coerce {}:{} to Ival'.format(type(raw), raw)) from e
 
     # display trim -- no side effects on self
-    def dtrim(self, prec=None):
+    def dtrim(self, prec=None, rounding=None):
         prec = self.prec if prec is None else prec
+        rounding = self.rounding if rounding is None else rounding
         if not isinstance(prec, int) or prec <= 0:
             raise TypeError('Only positive integers allowed')
-        if  self.ilength > prec+1:
-            tval = str(self.ival.num)
-            if tval[0] == '-':
-                tval = tval[1:]
-            tlen = len(tval)
-            return type(self)(Ival(ib_sgn(self.ival.num)*int(tval[:prec]), self.ival.off-tlen+prec), **self.kwargs)
+        if rounding not in _ROUNDINGS:
+            raise ValueError('Only {} allowed'.format(_ROUNDINGS))
+        num = self.ival.num
+        ilen = _ndigits(num)
+        if ilen > prec+1:
+            if _stats.on:
+                _stats.op('trim', num)
+            drop = ilen - prec
+            pad = _pow10(drop)
+            (quo, rem) = divmod(abs(num), pad)
+            if rounding == ROUND_HALF_EVEN and (2*rem > pad or (2*rem == pad and quo & 1)):
+                quo += 1
+            return type(self)(Ival(-quo if num < 0 else quo, self.ival.off-drop), **self.kwargs)
         return self
 
     # in-place trim to precision -- side effects
-    def trim(self, prec=None):
+    def trim(self, prec=None, rounding=None):
         if not self.trim_on:
             return self
         prec = self.prec if prec is None else prec
-        self.ival = self.dtrim(prec=prec).ival
+        if self._frozen:
+            return self.dtrim(prec=prec, rounding=rounding)
+        self.ival = self.dtrim(prec=prec, rounding=rounding).ival
+        return self
+
+    # make read-only (see _frozen)
+    def freeze(self):
+        self._frozen = True
         return self
 
     @property
     def kwargs(self):
-        return {'prec':self.prec, 'trim_on':self.trim_on}
-
-    # true if self's value is effectively an integer (i.e 2.0000000000000000000)
-    # concerned about int roundoff
+        return {'prec':self.prec, 'trim_on':self.trim_on, 'radix':self._radix}
+
+    # rebuild from raw state -- no parsing, no trim (pickling and ibcodec)
+    @classmethod
+    def _restore(cls, num, off, prec, trim_on, rounding, rep, frozen):
+        tmp = object.__new__(cls)
+        (tmp.ival, tmp.prec, tmp.trim_on, tmp.rounding, tmp.rep) = (Ival(num, off), prec, trim_on, rounding, rep)
+        if frozen:
+            tmp._frozen = True
+        return tmp
+
+    def __reduce__(self):
+        return (type(self)._restore, (self.ival.num, self.ival.off, self.prec, self.trim_on, self.rounding, self.rep, self._frozen))
+
+    # compact binary form (see ibcodec)
+    def to_bytes(self):
+        return pack(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        # IBReal itself takes either backend, as its constructor does
+        if cls is IBReal:
+            return unpack(data, _REALTAGS)
+        return unpack(data, cls._tag, cls)
+
+    # true if self's value is an integer (i.e 2.0000000000000000000)
+    # exact -- no digits after the point other than zeros
     @property
     def isint(self):
-        return self == int(self)
+        (num, off) = self.ival
+        return off <= 0 or num % _pow10(off) == 0
+
+    # exact value of a float (its binary fraction n/2**k is n*5**k/10**k)
+    @classmethod
+    def from_float(cls, val, prec=None, trim_on=None):
+        (num, den) = float(val).as_integer_ratio()
+        k = den.bit_length() - 1
+        return cls(Ival(num * 5**k, k), prec=prec, trim_on=trim_on)
 
     @property
     def _repr(self):
@@ -98,6 +230,9 @@ class IBReal:
             return self.rep
         neg = '-' if self.ival.num < 0 else ''
         txt = str(abs(self.ival.num))
+        if self.ival.off < 0:
+            # trimmed large number -- restore the dropped zeros
+            return '{}{}.0'.format(neg, txt + '0'*-self.ival.off)
         if len(txt) > self.ival.off:
             return '{}{}.{}'.format(neg, txt[:len(txt)-self.ival.off], txt[len(txt)-self.ival.off:] or '0')
         else:
@@ -106,9 +241,7 @@ class IBReal:
     # length of internal integer
     @property
     def ilength(self):
-        if self.ival.num == 0:
-            return 1
-        return int(log(abs(self.ival.num), 10)) + 1
+        return _ndigits(self.ival.num)
 
     # coercion engine
     def _from_raw(self, raw):
@@ -132,13 +265,51 @@ class IBReal:
         off = len(straw) - dot + ev
         return Ival(neg*int(straw), off)
 
+    # radix hooks for the mantissa kernels (IBComp): the raw pair, a value from a raw pair,
+    # and length, shifts and precision in radix units -- digits here, bits in IBBinReal
+    @property
+    def _raw(self):
+        return self.ival
+
+    @classmethod
+    def _make(cls, num, off, **kwargs):
+        return cls(Ival(num, off), **kwargs)
+
+    # val in this class's radix
+    @classmethod
+    def _of(cls, val, **kwargs):
+        if isinstance(val, IBReal) and val._radix == cls._radix:
+            return val
+        return cls(val, **kwargs)
+
+    @staticmethod
+    def _rlen(num):
+        return _ndigits(num)
+
+    @staticmethod
+    def _up(num, k):
+        return num * _pow10(k)
+
+    @staticmethod
+    def _down(num, k):
+        return num // _pow10(k)
+
+    @staticmethod
+    def _units(prec):
+        return prec
+
+    # adopt other's value (in-place ops)
+    def _take(self, other):
+        self.ival = other.ival
+        return self
+
     # ensure decimal alignment for addition and subtraction
     def _align(self, siv, oiv):
         if siv.off > oiv.off:
-            pad = 10**(siv.off-oiv.off)
+            pad = _pow10(siv.off-oiv.off)
             oiv = Ival(pad*oiv.num, siv.off)
         else:
-            pad = 10**(oiv.off-siv.off)
+            pad = _pow10(oiv.off-siv.off)
             siv = Ival(pad*siv.num, oiv.off)
         return (siv, oiv)
 
@@ -150,6 +321,8 @@ class IBReal:
             return other.__rmul__(self)
         oiv = other.ival
         siv = self.ival
+        if _stats.on:
+            _stats.op('mul', siv.num, oiv.num)
         ival = Ival(siv.num*oiv.num, siv.off+oiv.off)
         return type(self)(ival, **self.kwargs).trim()
 
@@ -159,8 +332,9 @@ class IBReal:
         return other.__mul__(self)
 
     def __imul__(self, other):
-        self.ival = self.__mul__(other).ival
-        return self
+        if self._frozen:
+            return self.__mul__(other)
+        return self._take(self.__mul__(other))
 
     def __truediv__(self, other):
         try:
@@ -168,21 +342,50 @@ class IBReal:
                 other = type(self)(other, **self.kwargs)
         except Exception:
             return other.__rtruediv__(self)
+        if _stats.on:
+            _stats.op('div', self.ival.num, other.ival.num)
+        if min(self.prec, other.ilength) >= self.newton_prec:
+            return self._recip_div(other)
         siv = self.ival
         oiv = other.ival
         mlen = self.prec + other.ilength - self.ilength
-        num = siv.num * 10**mlen  // oiv.num
+        if self.rounding == ROUND_HALF_EVEN and self.trim_on:
+            # two guard digits and a sticky digit for the trim kernel to round
+            mlen += 2
+            (quo, rem) = divmod(abs(siv.num) * _pow10(mlen), abs(oiv.num))
+            quo = 10*quo + (rem != 0)
+            num = quo if (siv.num < 0) == (oiv.num < 0) else -quo
+            off = mlen + 1 + siv.off - oiv.off
+            return type(self)(Ival(num, off), **self.kwargs).trim()
+        num = siv.num * _pow10(mlen)  // oiv.num
         off = mlen + siv.off - oiv.off
         return type(self)(Ival(num, off), **self.kwargs).trim()
 
+    # self/other as self times the (cached) reciprocal of other's leading digits
+    def _recip_div(self, other):
+        keep = self.prec + 3
+        (nnum, noff) = _chop(self.ival.num, self.ival.off, keep)
+        (dnum, doff) = _chop(other.ival.num, other.ival.off, keep)
+        # a full keep digits in the numerator, so in the quotient too
+        pad = keep - _ndigits(nnum)
+        if pad > 0:
+            (nnum, noff) = (nnum * _pow10(pad), noff + pad)
+        if dnum == 0:
+            raise ZeroDivisionError('division by zero')
+        (x, k) = _recip(abs(dnum), keep)
+        num = abs(nnum) * x >> k
+        off = _ndigits(dnum) + noff - doff
+        return type(self)(Ival(num if (nnum < 0) == (dnum < 0) else -num, off), **self.kwargs).trim()
+
     def __rtruediv__(self, other):
         if not isinstance(other, type(self)):
             other = type(self)(other, **self.kwargs)
         return other.__truediv__(self)
 
     def __itruediv__(self, other):
-        self.ival = self.__truediv__(other).ival
-        return self
+        if self._frozen:
+            return self.__truediv__(other)
+        return self._take(self.__truediv__(other))
 
     def __floordiv__(self, other):
         return type(self)(int(self.__truediv__(other)))
@@ -193,8 +396,9 @@ class IBReal:
         return other.__floordiv__(self)
 
     def __ifloordiv__(self, other):
-        self.ival = self.__floordiv__(other).ival
-        return self
+        if self._frozen:
+            return self.__floordiv__(other)
+        return self._take(self.__floordiv__(other))
 
     def __add__(self, other):
         try:
@@ -212,8 +416,9 @@ class IBReal:
         return other.__add__(self)
 
     def __iadd__(self, other):
-        self.ival = self.__add__(other).ival
-        return self
+        if self._frozen:
+            return self.__add__(other)
+        return self._take(self.__add__(other))
 
     def __sub__(self, other):
         try:
@@ -231,8 +436,33 @@ class IBReal:
         return other.__sub__(self)
 
     def __isub__(self, other):
-        self.ival = self.__sub__(other).ival
-        return self
+        if self._frozen:
+            return self.__sub__(other)
+        return self._take(self.__sub__(other))
+
+    # integer power by square-and-multiply on the raw mantissa
+    # intermediates carry guard digits; only the result is trimmed
+    # (__pow__ keeps its multiply loop for the series expansions)
+    def ipow(self, n):
+        n = int(n)
+        (num, off) = self.ival
+        (rnum, roff) = (1, 0)
+        keep = self.prec + n.bit_length()//3 + 3
+        exp = abs(n)
+        while exp:
+            if exp & 1:
+                (rnum, roff) = (rnum*num, roff+off)
+                if self.trim_on:
+                    (rnum, roff) = _chop(rnum, roff, keep)
+            exp >>= 1
+            if exp:
+                (num, off) = (num*num, off+off)
+                if self.trim_on:
+                    (num, off) = _chop(num, off, keep)
+        tmp = type(self)(Ival(rnum, roff), **self.kwargs)
+        if n < 0:
+            tmp = type(self)(Ival(1, 0), **self.kwargs).__truediv__(tmp)
+        return tmp
 
     def __pow__(self, other):
         try:
@@ -240,7 +470,7 @@ class IBReal:
                 other = type(self)(other, **self.kwargs)
         except Exception:
             return other.__rpow__(self)
-        tmp = type(self)(self.ival, **self.kwargs)
+        tmp = type(self)(self, **self.kwargs)
         if other == 0:
             tmp.ival = Ival(1, 0)
             return tmp.trim()
@@ -261,14 +491,24 @@ class IBReal:
         return other.__pow__(self)
 
     def __ipow__(self, other):
-        self.ival = self.__pow__(other).ival
-        return self
+        if self._frozen:
+            return self.__pow__(other)
+        return self._take(self.__pow__(other))
 
+    # truncated toward zero, exactly
     def __int__(self):
-        return int(self.__float__())
+        (num, off) = self.ival
+        if off <= 0:
+            return num * _pow10(-off)
+        tmp = abs(num) // _pow10(off)
+        return -tmp if num < 0 else tmp
 
+    # correctly rounded (int/int true division rounds once)
     def __float__(self):
-        return self.ival.num/10**self.ival.off
+        (num, off) = self.ival
+        if off <= 0:
+            return float(num * _pow10(-off))
+        return num / _pow10(off)
 
     def __neg__(self):
         return type(self)(Ival(-self.ival.num, self.ival.off), **self.kwargs)
@@ -276,41 +516,57 @@ class IBReal:
     def __abs__(self):
         return type(self)(Ival(abs(self.ival.num), self.ival.off), **self.kwargs)
 
-    def __eq__(self, other):
+    # three-way compare: signs first, then decimal exponent ranges from the bit lengths
+    # mantissas are only aligned (a big multiply) when the magnitudes overlap
+    def _cmp(self, other):
         if not isinstance(other, type(self)):
             other = type(self)(other, **self.kwargs)
+        (snum, soff) = self.ival
+        (onum, ooff) = other.ival
+        if soff == ooff:
+            return (snum > onum) - (snum < onum)
+        ssgn = (snum > 0) - (snum < 0)
+        osgn = (onum > 0) - (onum < 0)
+        if ssgn != osgn or ssgn == 0:
+            return (ssgn > osgn) - (ssgn < osgn)
+        (slo, shi) = _mag(snum, soff)
+        (olo, ohi) = _mag(onum, ooff)
+        if shi <= olo:
+            return -ssgn
+        if ohi <= slo:
+            return ssgn
         (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num == oiv.num
+        return (siv.num > oiv.num) - (siv.num < oiv.num)
+
+    # abs(self) < 10**-exp -- convergence test without abs() or alignment
+    def is_below(self, exp):
+        (num, off) = self.ival
+        if num == 0:
+            return True
+        (lo, hi) = _mag(num, off)
+        if hi <= -exp:
+            return True
+        if lo >= -exp:
+            return False
+        return abs(num) < _pow10(off - exp)
+
+    def __eq__(self, other):
+        return self._cmp(other) == 0
 
     def __lt__(self, other):
-        if not isinstance(other, type(self)):
-            other = type(self)(other, **self.kwargs)
-        (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num < oiv.num
+        return self._cmp(other) < 0
 
     def __gt__(self, other):
-        if not isinstance(other, type(self)):
-            other = type(self)(other, **self.kwargs)
-        (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num > oiv.num
+        return self._cmp(other) > 0
 
     def __le__(self, other):
-        if not isinstance(other, type(self)):
-            other = type(self)(other, **self.kwargs)
-        (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num <= oiv.num
+        return self._cmp(other) <= 0
 
     def __ge__(self, other):
-        if not isinstance(other, type(self)):
-            other = type(self)(other, **self.kwargs)
-        (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num >= oiv.num
+        return self._cmp(other) >= 0
 
     def __ne__(self, other):
-        if not isinstance(other, type(self)):
-            other = type(self)(other, **self.kwargs)
-        (siv, oiv) = self._align(self.ival, other.ival)
-        return siv.num != oiv.num
+        return self._cmp(other) != 0
 
     def __str__(self):
         return self.trim()._repr
@@ -319,4 +575,6 @@ class IBReal:
         return self.trim()._repr
 
 # here to prevent circular import
-from .ibfuncs import ib_exp, ib_log, ib_sgn
+from .ibfuncs import ib_exp, ib_log
+from .ibcodec import pack, unpack, _REALTAGS
+from .ibbinary import IBBinReal
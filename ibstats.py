@@ -0,0 +1,113 @@
+from os import environ
+from time import perf_counter
+
+# hot-path instrumentation: op counts by operand size, series iterations, memo traffic, time
+# off unless enabled -- while off, each instrumented site costs one attribute test
+class IBStats:
+    """
+    IBStats counts what a computation spends its time on. One instance (ib_stats) is shared
+    by the whole process; worker processes (i.e. ibfractal tiles) keep their own counts.
+
+    Usage:
+    ib_stats.on = True            :: or $ export IBR_PROFILE=1 (read once, at import)
+    ...
+    ib_stats.snapshot()
+
+    with profiling() as prof:     :: counts for one block only
+        ...
+    prof.stats
+
+    snapshot() is a dict of plain values:
+    ops:    {op: {'count': n, 'digits': {size: n}}} -- mul, div, trim (IBReal), cmul, cdiv
+            (IBComp); size is the power of two at or above the largest operand's digit count
+    series: {kernel: {'calls': n, 'iterations': n}} -- exp, sincos, atan, log_atanh, log_agm,
+            root (Newton steps) and the constants pi, e and atanh (ln2/ln10)
+    memo:   {function: {'hits': n, 'ladder_hits': n, 'misses': n}} -- memoized ib_* functions
+    time:   {function: {'calls': n, 'seconds': s}} -- memo misses, i.e. real computation,
+            nested calls included
+    """
+    def __init__(self):
+        self.on = bool(environ.get('IBR_PROFILE'))
+        self.reset()
+
+    # zero all counts
+    def reset(self):
+        self._ops = dict()
+        self._series = dict()
+        self._memo = dict()
+        self._time = dict()
+
+    # an arithmetic op on raw mantissas -- bucketed by the largest (digits from bits)
+    def op(self, name, *nums):
+        ndig = max(abs(i).bit_length() for i in nums) * 30103 // 100000 + 1
+        hist = self._ops.setdefault(name, dict())
+        size = 1 << (ndig-1).bit_length()
+        hist[size] = hist.get(size, 0) + 1
+
+    # one kernel call that took cnt iterations
+    def iters(self, name, cnt):
+        tmp = self._series.setdefault(name, [0, 0])
+        tmp[0] += 1
+        tmp[1] += cnt
+
+    # kind is hits, ladder_hits or misses
+    def memo(self, name, kind):
+        tmp = self._memo.setdefault(name, {'hits':0, 'ladder_hits':0, 'misses':0})
+        tmp[kind] += 1
+
+    def time(self, name, secs):
+        tmp = self._time.setdefault(name, [0, 0.0])
+        tmp[0] += 1
+        tmp[1] += secs
+
+    def snapshot(self):
+        return {
+            'enabled': self.on,
+            'ops': {k: {'count':sum(v.values()), 'digits':dict(sorted(v.items()))} for (k, v) in self._ops.items()},
+            'series': {k: {'calls':v[0], 'iterations':v[1]} for (k, v) in self._series.items()},
+            'memo': {k: dict(v) for (k, v) in self._memo.items()},
+            'time': {k: {'calls':v[0], 'seconds':v[1]} for (k, v) in self._time.items()},
+        }
+
+# process-wide counters
+# singleton
+ib_stats = IBStats()
+
+# after - before for nested snapshot dicts -- entries that did not change are dropped
+def _diff(after, before):
+    ret = dict()
+    for (key, val) in after.items():
+        old = before.get(key)
+        if isinstance(val, dict):
+            tmp = _diff(val, old or dict())
+            if tmp:
+                ret[key] = tmp
+        elif val != (old or 0):
+            ret[key] = val - (old or 0)
+    return ret
+
+# scope profiling to a block
+# i.e. with profiling() as prof: ... then prof.stats holds what the block did (snapshot
+# layout, without 'enabled') and prof.seconds its wall time
+# counting stays on afterwards only if it was on before
+class profiling:
+    def __init__(self):
+        self.stats = None
+        self.seconds = None
+        self.was = None
+        self.before = None
+        self.start = None
+
+    def __enter__(self):
+        self.was = ib_stats.on
+        self.before = ib_stats.snapshot()
+        ib_stats.on = True
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.seconds = perf_counter() - self.start
+        after = ib_stats.snapshot()
+        ib_stats.on = self.was
+        tmp = _diff(after, self.before)
+        self.stats = {k: tmp.get(k, dict()) for k in ('ops', 'series', 'memo', 'time')}
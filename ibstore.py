@@ -0,0 +1,150 @@
+import mmap
+import os
+import struct
+from os import environ
+from threading import Lock
+
+# file layout: magic, then appended records of
+#   header (name length, prec, offset, sign, mantissa length), name, mantissa bytes (little-endian)
+_MAGIC = b'IBRS\x01'
+_HEAD = struct.Struct('<HqqBQ')
+
+# one record -- num * 10**-off stored as name at prec
+def _pack(name, prec, num, off):
+    bname = name.encode()
+    blen = (abs(num).bit_length() + 7) // 8
+    return _HEAD.pack(len(bname), prec, off, num < 0, blen) + bname + abs(num).to_bytes(blen, 'little')
+
+# persistent store of high-precision constants
+class IBConstStore:
+    """
+    IBConstStore keeps expensive constants (pi, ln2, ln10, e) on disk so worker processes can
+    skip recomputing them. Values are kept as (name, prec) -> mantissa and offset; the file is
+    memory-mapped and mantissas are only decoded when asked for.
+
+    Usage:
+    store = IBConstStore(path)
+
+    path: file to use -- created if missing. Records are only ever appended (one write each),
+          so several processes can share a file.
+
+    $ export IBR_CONST_STORE=/path/to/consts.ibrs :: set environment var to enable the store at import
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.index = dict()
+        self.size = 0
+        self.mm = None
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'ab') as fh:
+                if fh.tell() == 0:
+                    fh.write(_MAGIC)
+        self._refresh()
+
+    # (re)map the file and index any records not seen yet
+    # a trailing partial record (writer still busy or died) is left for later
+    def _refresh(self):
+        size = os.path.getsize(self.path)
+        if size == self.size and self.mm is not None:
+            return
+        if size < self.size:
+            # rewritten by invalidate() -- index from scratch
+            (self.index, self.size) = (dict(), 0)
+        if self.mm is not None:
+            self.mm.close()
+        with open(self.path, 'rb') as fh:
+            self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError('{} is not a constant store'.format(self.path))
+        pos = max(self.size, len(_MAGIC))
+        while pos + _HEAD.size <= len(self.mm):
+            (nlen, prec, off, sign, blen) = _HEAD.unpack_from(self.mm, pos)
+            end = pos + _HEAD.size + nlen + blen
+            if end > len(self.mm):
+                break
+            name = self.mm[pos+_HEAD.size:pos+_HEAD.size+nlen].decode()
+            self.index[(name, prec)] = (pos + _HEAD.size + nlen, blen, off, sign)
+            pos = end
+        self.size = pos
+
+    def _decode(self, loc):
+        (pos, blen, off, sign) = loc
+        num = int.from_bytes(self.mm[pos:pos+blen], 'little')
+        return (-num if sign else num, off)
+
+    # highest-precision entry for name at or above prec
+    # returns (prec, num, off) or None
+    def get(self, name, prec):
+        with self.lock:
+            best = self._best(name, prec)
+            if best is None:
+                # another process may have added it
+                self._refresh()
+                best = self._best(name, prec)
+            if best is None:
+                return None
+            return (best,) + self._decode(self.index[(name, best)])
+
+    def _best(self, name, prec):
+        precs = [p for (n, p) in self.index if n == name and p >= prec]
+        return max(precs) if precs else None
+
+    # append a value -- num * 10**-off at prec
+    def put(self, name, prec, num, off):
+        rec = _pack(name, prec, num, off)
+        with self.lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, rec)
+            finally:
+                os.close(fd)
+            self._refresh()
+
+    # [{name, prec, off, bytes}] for everything stored
+    def entries(self):
+        with self.lock:
+            self._refresh()
+            return [{'name': n, 'prec': p, 'off': loc[2], 'bytes': loc[1]}
+                    for ((n, p), loc) in sorted(self.index.items())]
+
+    # drop entries for name (all if None) by rewriting the file
+    # returns the number of entries removed
+    def invalidate(self, name=None):
+        with self.lock:
+            self._refresh()
+            keep = [(k, self._decode(loc)) for (k, loc) in sorted(self.index.items()) if name is not None and k[0] != name]
+            removed = len(self.index) - len(keep)
+            tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmp, 'wb') as fh:
+                fh.write(_MAGIC)
+                for ((n, p), (num, off)) in keep:
+                    fh.write(_pack(n, p, num, off))
+            self.mm.close()
+            os.replace(tmp, self.path)
+            (self.mm, self.index, self.size) = (None, dict(), 0)
+            self._refresh()
+            return removed
+
+    def close(self):
+        with self.lock:
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+
+    def __repr__(self):
+        return 'IBConstStore({!r})'.format(self.path)
+
+# the store in use, if any
+_store = IBConstStore(environ['IBR_CONST_STORE']) if environ.get('IBR_CONST_STORE') else None
+
+def get_store():
+    return _store
+
+# switch stores -- None disables
+def set_store(path):
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = None if path is None else IBConstStore(path)
+    return _store
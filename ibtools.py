@@ -1,16 +1,93 @@
 from .ibreal import IBReal as R
 from .ibcomp import IBComp as C
-from .ibfuncs import ib_pi, ib_sgn, MemoizeIBRCall as M
+from .ibfuncs import ib_pi, ib_sgn, ib_const, ib_small, ib_cis_table, MemoizeIBRCall as M
+from .ibcontext import getdefaultcontext
+from .ibfuncs import _fx_named, _fx_clear, _GUARD
+from .ibstore import get_store, set_store
+from .ibstats import ib_stats, profiling
 from os import environ
 from functools import wraps
 
 # set global precision (internal integer length)
+# threads/tasks inside a localcontext keep their own precision
 def set_global_prec(num):
+    if not isinstance(num, int) or num <= 0:
+        raise TypeError('Only positive integers allowed')
+    getdefaultcontext().prec = num
+    # picked up by child processes at import
     environ['IBR_DEF_PREC'] = str(num)
 
 # clear all caches
+# returns {memoizer: entries removed}
 def clear_caches():
-    M.clearall()
+    ib_const.clear()
+    ib_cis_table.clear()
+    return M.clearall()
+
+# drop the fixed-point constants (pi, ln2, ln10, e) and the stored pi series sums
+# memo caches are untouched -- see clear_caches
+def clear_fx_consts():
+    _fx_clear()
+
+# per-function memo counters
+# {memoizer: {entries, bytes, maxbytes, hits, misses, evictions}}
+def cache_stats():
+    return M.allstats()
+
+# byte budget for every memoizer (and any created later)
+def set_cache_budget(maxbytes):
+    if not isinstance(maxbytes, int) or maxbytes < 0:
+        raise TypeError('Only non-negative integers allowed')
+    M.maxbytes = maxbytes
+    for i in M._instances:
+        i.set_maxbytes(maxbytes)
+
+# hot-path instrumentation (see ibstats) -- off by default
+# with profiling() as prof: ... scopes it to a block instead
+def set_profiling(flag=True):
+    ib_stats.on = bool(flag)
+
+# {ops, series, memo, time} counts since the last reset
+def prof_stats():
+    return ib_stats.snapshot()
+
+def reset_prof_stats():
+    ib_stats.reset()
+
+# 10**-limit -- pooled when limit is a whole number
+def _lowval(limit, kwargs):
+    if limit.isint:
+        return ib_small(int(limit), **kwargs)
+    return ib_const((1, 0), **kwargs) / 10**limit
+
+# use the constant store at path (None disables)
+# (or $ export IBR_CONST_STORE=path before import)
+def set_const_store(path):
+    return set_store(path)
+
+# compute and save constants at prec digits so later processes load them
+# names: any of pi, ln2, ln10, e (all by default)
+def prewarm_const_store(prec, names=('pi', 'ln2', 'ln10', 'e')):
+    store = get_store()
+    if store is None:
+        raise ValueError('No constant store set')
+    wp = prec + _GUARD
+    for name in names:
+        val = _fx_named(name, wp)
+        if store.get(name, wp) is None:
+            store.put(name, wp, val, wp)
+    return const_store_info()
+
+# [{name, prec, off, bytes}] for the stored constants
+def const_store_info():
+    store = get_store()
+    return [] if store is None else store.entries()
+
+# drop stored constants for name (all if None)
+# returns the number of entries removed
+def invalidate_const_store(name=None):
+    store = get_store()
+    return 0 if store is None else store.invalidate(name)
 
 # prettifies output by zeroing out very low order numbers
 # return chopped off values if effectively zero.
@@ -20,14 +97,15 @@ def eff_0(val, limit=None):
     if not isinstance(val, R) and not isinstance(val, C):
         val = R(val)
     if limit is None:
-        pt9 = R((9, 1), **val.kwargs)
-        limit = pt9 * val.prec
+        limit = ib_const((9, 1), **val.kwargs) * val.prec
     if not isinstance(limit, R):
         limit = R(limit, **val.kwargs)
-    zero = R((0, 0), **val.kwargs)
-    one = R((1, 0), **val.kwargs)
-    lowval = one / 10**limit
+    zero = ib_const((0, 0), **val.kwargs)
+    lowval = _lowval(limit, val.kwargs)
+    whole = limit.isint
     def _tform(num):
+        if whole:
+            return zero if num.is_below(int(limit)) else num
         return zero if abs(num) < lowval else num
     if isinstance(val, C):
         return C((_tform(val.rcomp), _tform(val.icomp)), **val.kwargs)
@@ -43,16 +121,14 @@ def eff_int(val, limit=None):
     if not isinstance(val, R) and not isinstance(val, C):
         val = R(val)
     if limit is None:
-        pt9 = R((9, 1), **val.kwargs)
-        limit = pt9 * val.prec
+        limit = ib_const((9, 1), **val.kwargs) * val.prec
     if not isinstance(limit, R):
         limit = R(limit, **val.kwargs)
     def _getint(rval):
         st = str(abs(rval.ival.num))
         ln = len(st)
-        one = R((1, 0), **rval.kwargs)
-        zero = R((0, 0), **rval.kwargs)
-        neg1 = R((-1, 0), **rval.kwargs)
+        one = ib_const((1, 0), **rval.kwargs)
+        zero = ib_const((0, 0), **rval.kwargs)
         off = rval.ival.off
         dot = ln - off
         if dot < 0:
@@ -88,20 +164,17 @@ def eff_pi(num):
     if not isinstance(num, R) and not isinstance(num, C):
         num = R(num)
     def _tform(val):
-        zero = R((0, 0), **val.kwargs)
-        one = R((1, 0), **val.kwargs)
-        ten = R((10, 0), **val.kwargs)
-        overshoot = one
+        zero = ib_const((0, 0), **val.kwargs)
         pi = ib_pi(**val.kwargs)
-        pt9 = R((9, 1), **val.kwargs)
-        limit = pt9 * val.prec
-        lowval = one / 10**limit
+        limit = ib_const((9, 1), **val.kwargs) * val.prec
+        lowval = _lowval(limit, val.kwargs)
+        whole = limit.isint
         cnt = 0
         tmp = R(val)
         while (abs(tmp) >= pi):
             tmp -= ib_sgn(tmp)*pi
             cnt += 1 
-            if abs(tmp) < lowval:
+            if tmp.is_below(int(limit)) if whole else abs(tmp) < lowval:
                 neg = '' if val > zero else '-'
                 # special __repr__
                 rep = '{}{}\u03c0'.format(neg, cnt)
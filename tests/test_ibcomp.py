@@ -0,0 +1,43 @@
+from fractions import Fraction
+from ..ibreal import IBReal as R
+from ..ibcomp import IBComp as C
+
+# exact value of an IBReal
+def _frac(val):
+    (num, off) = val.ival
+    return Fraction(num, 10**off) if off >= 0 else Fraction(num * 10**-off)
+
+# true if both components of got are within tol (relative) of (re, im)
+def _close(got, re, im, tol=Fraction(1, 10**45)):
+    for (val, ref) in ((got.rcomp, re), (got.icomp, im)):
+        if abs(_frac(val) - ref) > tol * abs(ref):
+            return False
+    return True
+
+def test_ipow_small_component():
+    for radix in (10, 2):
+        z = C((R(1, radix=radix), R('1e-100', radix=radix)))
+        assert _close(z.ipow(3), Fraction(1) - 3*Fraction(1, 10**200), 3*Fraction(1, 10**100) - Fraction(1, 10**300))
+        z = C((R('-1e-100', radix=radix), R(-1, radix=radix)))
+        assert _close(z.ipow(5), -Fraction(5, 10**100), -Fraction(1))
+
+def test_ipow_matches_multiply():
+    z = C('1.5+2.25i')
+    assert z.ipow(7) == z**7
+
+def test_div_small_component():
+    for radix in (10, 2):
+        z = C((R(1, radix=radix), R('1e-100', radix=radix))) / 2
+        assert _close(z, Fraction(1, 2), Fraction(1, 2*10**100))
+        num = C((R(-3, radix=radix), R('-2e-100', radix=radix)))
+        den = C((R(7, radix=radix), R('1e-90', radix=radix)))
+        (a, b, c, d) = (Fraction(-3), -Fraction(2, 10**100), Fraction(7), Fraction(1, 10**90))
+        n = c*c + d*d
+        assert _close(num / den, (a*c + b*d) / n, (b*c - a*d) / n)
+
+def test_reciprocal_negative_small_component():
+    for radix in (10, 2):
+        z = C((R(1, radix=radix), R('1e-100', radix=radix)))
+        n = 1 + Fraction(1, 10**200)
+        for w in (z.reciprocal(), z**-1):
+            assert _close(w, 1 / n, -Fraction(1, 10**100) / n)
@@ -0,0 +1,31 @@
+from fractions import Fraction
+from ..ibreal import IBReal as R
+from ..ibcomp import IBComp as C
+from ..ibfuncs import ib_sqrt
+
+# exact value of an IBReal
+def _frac(val):
+    (num, off) = val.ival
+    return Fraction(num, 10**off) if off >= 0 else Fraction(num * 10**-off)
+
+# w*w == z to about prec digits of each of z's components
+def _squares_to(w, z, digits=45):
+    sq = w.square()
+    for (got, ref) in ((sq.rcomp, z.rcomp), (sq.icomp, z.icomp)):
+        if abs(_frac(got) - _frac(ref)) > abs(_frac(ref)) / 10**digits:
+            return False
+    return True
+
+def test_sqrt_comp_small_imaginary():
+    z = C((R(1), R('1e-100')))
+    w = ib_sqrt(z)
+    assert abs(_frac(w.icomp) - Fraction(5, 10**101)) < Fraction(1, 10**145)
+    assert _squares_to(w, z)
+
+def test_sqrt_comp_negative_real_small_imaginary():
+    for sgn in (1, -1):
+        z = C((R(-3), R(sgn) * R('1.2345678901234567890123456789e-30')))
+        w = ib_sqrt(z)
+        # 2*re*im == b needs every digit of the tiny real part
+        assert w.rcomp > 0 and (w.icomp > 0) == (sgn > 0)
+        assert _squares_to(w, z)